@@ -1,7 +1,15 @@
-import random
+import re
+import time
 from datetime import date
+from itertools import islice
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
 from account.models import IDCard
+from api.utils.card_verification import CardVerification
+
+
+VALID_ID_NUMBER = re.compile(r'^LY[AY]\d{7}$')
 
 
 class Command(BaseCommand):
@@ -13,83 +21,98 @@ class Command(BaseCommand):
             action='store_true',
             help='Show what would be updated without making changes',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Number of cards read and written per batch',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Ignored, kept so existing scripts still run. The age prefixes are cheap enough to compute inline',
+        )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
-        
-        # Get all ID cards
-        id_cards = IDCard.objects.select_related('user__user_request').all()
-        
+        batch_size = options['batch_size']
+        verbose = options['verbosity'] >= 2
+        started = time.monotonic()
+        today = date.today()
+
+        # Stream only the columns needed, cards are never loaded as model instances
+        id_cards = IDCard.objects.order_by().values_list(
+            'id', 'id_number', 'user__email', 'user__user_request__date_of_birth'
+        ).iterator(chunk_size=batch_size)
+
+        processed_count = 0
         updated_count = 0
         skipped_count = 0
         error_count = 0
-        
-        self.stdout.write(self.style.SUCCESS(f'Processing {id_cards.count()} ID cards...'))
-        
-        for card in id_cards:
+
+        self.stdout.write(self.style.SUCCESS('Processing ID cards...'))
+
+        while True:
+            batch = list(islice(id_cards, batch_size))
+            if not batch:
+                break
+            processed_count += len(batch)
+
             # Check if ID already matches the pattern (LYA or LYY followed by 7 digits)
-            if card.id_number and (
-                (card.id_number.startswith('LYA') and len(card.id_number) == 10 and card.id_number[3:].isdigit()) or
-                (card.id_number.startswith('LYY') and len(card.id_number) == 10 and card.id_number[3:].isdigit())
-            ):
-                skipped_count += 1
+            cards = [card for card in batch if not (card[1] and VALID_ID_NUMBER.match(card[1]))]
+            skipped_count += len(batch) - len(cards)
+            if not cards:
                 continue
-            
-            try:
-                # Get user's age from date_of_birth if available
-                age = None
-                if card.user.user_request and card.user.user_request.date_of_birth:
-                    dob = card.user.user_request.date_of_birth
-                    today = date.today()
-                    age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
-                
-                # Determine prefix based on age
-                if age is not None and age >= 31:
-                    prefix = 'LYA'
-                else:
-                    prefix = 'LYY'
-                
-                # Generate new ID number
-                random_digits = str(random.randint(1000000, 9999999))
-                new_id_number = f'{prefix}{random_digits}'
-                
-                old_id = card.id_number
-                
-                if dry_run:
+
+            prefixes = [IDCard.id_prefix_for_birth_date(card[3], today) for card in cards]
+
+            if dry_run:
+                new_id_numbers = [f'{prefix}#######' for prefix in prefixes]
+            else:
+                # Numbers come from the id sequence, so they can't clash with each other or existing cards
+                new_id_numbers = IDCard.allocate_id_numbers(prefixes)
+
+            if verbose:
+                for card, new_id_number in zip(cards, new_id_numbers):
                     self.stdout.write(
-                        f'Would update: {card.user.email} - '
-                        f'Old: {old_id} -> New: {new_id_number} '
-                        f'(Age: {age if age else "Unknown"})'
+                        f'{"Would update" if dry_run else "Updated"}: {card[2]} - '
+                        f'Old: {card[1]} -> New: {new_id_number}'
                     )
-                else:
-                    card.id_number = new_id_number
-                    card.save()
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f'Updated: {card.user.email} - '
-                            f'Old: {old_id} -> New: {new_id_number} '
-                            f'(Age: {age if age else "Unknown"})'
-                        )
+
+            if dry_run:
+                updated_count += len(cards)
+                continue
+
+            try:
+                with transaction.atomic():
+                    IDCard.objects.bulk_update(
+                        [IDCard(id=card[0], id_number=new_id_number) for card, new_id_number in zip(cards, new_id_numbers)],
+                        ['id_number'],
+                        batch_size=batch_size,
                     )
-                
-                updated_count += 1
-                
+                    # Same timestamp for the whole batch, no need to carry it in the CASE above
+                    IDCard.objects.filter(id__in=[card[0] for card in cards]).update(updated_at=timezone.now())
+                # bulk_update skips post_save, the old numbers must stop verifying right away
+                CardVerification.invalidate(*[card[1] for card in cards], *new_id_numbers)
+                updated_count += len(cards)
             except Exception as e:
-                error_count += 1
-                self.stdout.write(
-                    self.style.ERROR(
-                        f'Error updating card for {card.user.email}: {str(e)}'
-                    )
-                )
-        
+                error_count += len(cards)
+                self.stdout.write(self.style.ERROR(f'Error updating batch of {len(cards)} cards: {str(e)}'))
+
+        elapsed = time.monotonic() - started
+
         # Summary
         self.stdout.write(self.style.SUCCESS('\n--- Summary ---'))
-        self.stdout.write(f'Total ID cards processed: {id_cards.count()}')
+        self.stdout.write(f'Total ID cards processed: {processed_count}')
         self.stdout.write(self.style.SUCCESS(f'Updated: {updated_count}'))
         self.stdout.write(self.style.WARNING(f'Skipped (already valid): {skipped_count}'))
         if error_count > 0:
             self.stdout.write(self.style.ERROR(f'Errors: {error_count}'))
-        
+        self.stdout.write(
+            f'Elapsed: {elapsed:.2f}s ({processed_count / elapsed if elapsed else 0:.0f} cards/s)'
+        )
+
         if dry_run:
             self.stdout.write(
                 self.style.WARNING(
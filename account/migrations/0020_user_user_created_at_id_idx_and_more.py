@@ -0,0 +1,22 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0019_user_membership_expiry_user_membership_type'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['created_at', 'id'], name='user_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userrequest',
+            index=models.Index(fields=['created_at', 'id'], name='userrequest_created_at_id_idx'),
+        ),
+    ]
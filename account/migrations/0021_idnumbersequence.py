@@ -0,0 +1,49 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:33
+
+import random
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def dedupe_id_numbers(apps, schema_editor):
+    """Give every card sharing an id number (or having none) a fresh one so it can become unique"""
+    IDCard = apps.get_model('account', 'IDCard')
+
+    taken = set(IDCard.objects.values_list('id_number', flat=True))
+    duplicated = (
+        IDCard.objects.values('id_number')
+        .annotate(cards=Count('id'))
+        .filter(cards__gt=1)
+        .values_list('id_number', flat=True)
+    )
+    for id_number in list(duplicated) + ['']:
+        cards = IDCard.objects.filter(id_number=id_number).order_by('created_at')
+        if id_number:
+            # The oldest card keeps its number
+            cards = cards[1:]
+        for card in cards:
+            prefix = card.id_number[:3] if card.id_number[:3] in ('LYA', 'LYY') else 'LYY'
+            new_id_number = f'{prefix}{random.randint(1000000, 9999999)}'
+            while new_id_number in taken:
+                new_id_number = f'{prefix}{random.randint(1000000, 9999999)}'
+            taken.add(new_id_number)
+            IDCard.objects.filter(id=card.id).update(id_number=new_id_number)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0020_user_user_created_at_id_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IDNumberSequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(dedupe_id_numbers, migrations.RunPython.noop),
+    ]
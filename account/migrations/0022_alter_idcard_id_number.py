@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0021_idnumbersequence'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='idcard',
+            name='id_number',
+            field=models.CharField(max_length=64, unique=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0022_alter_idcard_id_number'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='idcard',
+            index=models.Index(fields=['expired', 'expired_at'], name='idcard_expired_at_idx'),
+        ),
+    ]
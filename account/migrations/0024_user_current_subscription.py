@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:39
+
+from datetime import date
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def set_current_subscriptions(apps, schema_editor):
+    """Point every member at their newest active subscription"""
+    User = apps.get_model('account', 'User')
+    MembershipSubscription = apps.get_model('subscription', 'MembershipSubscription')
+
+    today = date.today()
+    current = {}
+    active = MembershipSubscription.objects.filter(
+        status='active', start_date__lte=today, end_date__gte=today
+    ).order_by('created_at').values_list('user_id', 'id')
+    for user_id, subscription_id in active:
+        # Ordered oldest first, so the newest subscription wins
+        current[user_id] = subscription_id
+    for user_id, subscription_id in current.items():
+        User.objects.filter(pk=user_id).update(current_subscription_id=subscription_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0023_idcard_idcard_expired_at_idx'),
+        ('subscription', '0003_membershipsubscription_subscription_user_active_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='current_subscription',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='subscription.membershipsubscription'),
+        ),
+        migrations.RunPython(set_current_subscriptions, migrations.RunPython.noop),
+    ]
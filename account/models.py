@@ -1,7 +1,10 @@
-import random, uuid
+import uuid
+from datetime import date
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
 
 # Choices for Gender and Unit
 class Gender(models.TextChoices):
@@ -186,6 +189,14 @@ class User(AbstractBaseUser, PermissionsMixin):
     ]
     membership_type = models.CharField(max_length=20, choices=MEMBERSHIP_TYPE_CHOICES, default='full')
     membership_expiry = models.DateField(null=True, blank=True)
+    # Denormalized pointer to the active subscription, see MembershipSubscription.refresh_current_subscription
+    current_subscription = models.ForeignKey(
+        'subscription.MembershipSubscription',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
 
     # System Fields
     is_superuser = models.BooleanField(default=False)
@@ -201,6 +212,11 @@ class User(AbstractBaseUser, PermissionsMixin):
     objects = UserManager()
     USERNAME_FIELD = "email"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='user_created_at_id_idx'),
+        ]
+
     def __str__(self):
         return self.email
     
@@ -223,10 +239,19 @@ class User(AbstractBaseUser, PermissionsMixin):
         return self.user_request if self.user_request else None
 
 
+class IDNumberSequence(models.Model):
+    """Counter that ID card numbers are allocated from, see IDCard.allocate_id_digits"""
+    name = models.CharField(max_length=50, primary_key=True)
+    last_value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.last_value}"
+
+
 class IDCard(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.OneToOneField(User, on_delete=models.CASCADE)
-    id_number = models.CharField(max_length=64)
+    id_number = models.CharField(max_length=64, unique=True)
     first_time = models.BooleanField(default=True)
     is_active = models.BooleanField(default=False)
     expired = models.BooleanField(default=True)
@@ -235,29 +260,148 @@ class IDCard(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Used by IDCard.expire_overdue
+            models.Index(fields=['expired', 'expired_at'], name='idcard_expired_at_idx'),
+        ]
+
+    # Id numbers are a prefix followed by 7 digits (1000000 - 9999999)
+    ID_NUMBER_SEQUENCE = 'idcard'
+    ID_NUMBER_MIN = 1000000
+    ID_NUMBER_SPACE = 9000000
+    # Coprime with ID_NUMBER_SPACE, spreads consecutive sequence values over the whole range
+    ID_NUMBER_MULTIPLIER = 7654321
+
+    @staticmethod
+    def id_prefix_for_birth_date(date_of_birth, today=None):
+        """Return the id number prefix for someone born on ``date_of_birth``."""
+        # Get user's age from date_of_birth if available
+        age = None
+        if date_of_birth:
+            from datetime import date
+            today = today or date.today()
+            age = today.year - date_of_birth.year - ((today.month, today.day) < (date_of_birth.month, date_of_birth.day))
+
+        # Determine prefix based on age
+        # LYA for 31 years and above, LYY for 1-30 years
+        if age is not None and age >= 31:
+            return 'LYA'
+        return 'LYY'  # Default to LYY if age is unknown or 1-30
+
+    @classmethod
+    def get_id_prefix(cls, user):
+        """Return the id number prefix for the user's age group."""
+        date_of_birth = user.user_request.date_of_birth if user.user_request else None
+        return cls.id_prefix_for_birth_date(date_of_birth)
+
+    @classmethod
+    def allocate_id_digits(cls, count):
+        """
+        Reserve ``count`` values from the id number sequence in one UPDATE.
+
+        Values are mapped to 7 digit numbers through a bijection, so numbers
+        handed out by the sequence never repeat while still looking random.
+        """
+        with transaction.atomic():
+            IDNumberSequence.objects.get_or_create(name=cls.ID_NUMBER_SEQUENCE)
+            IDNumberSequence.objects.filter(name=cls.ID_NUMBER_SEQUENCE).update(
+                last_value=F('last_value') + count
+            )
+            last_value = IDNumberSequence.objects.values_list('last_value', flat=True).get(
+                name=cls.ID_NUMBER_SEQUENCE
+            )
+        if last_value > cls.ID_NUMBER_SPACE:
+            raise ValueError('ID card numbers are exhausted')
+        return [
+            cls.ID_NUMBER_MIN + (value * cls.ID_NUMBER_MULTIPLIER) % cls.ID_NUMBER_SPACE
+            for value in range(last_value - count + 1, last_value + 1)
+        ]
+
+    @classmethod
+    def allocate_id_numbers(cls, prefixes):
+        """Return a new, unused id number for each prefix in ``prefixes``."""
+        id_numbers = [None] * len(prefixes)
+        pending = list(range(len(prefixes)))
+        while pending:
+            digits = cls.allocate_id_digits(len(pending))
+            candidates = {index: f'{prefixes[index]}{number}' for index, number in zip(pending, digits)}
+            # Numbers given out randomly before the sequence existed can still clash
+            taken = set(
+                cls.objects.filter(id_number__in=candidates.values()).values_list('id_number', flat=True)
+            )
+            pending = []
+            for index, id_number in candidates.items():
+                if id_number in taken:
+                    pending.append(index)
+                else:
+                    id_numbers[index] = id_number
+        return id_numbers
+
+    @classmethod
+    def build_id_numbers(cls, users):
+        """Return a new, unused id number for each of ``users``."""
+        return cls.allocate_id_numbers([cls.get_id_prefix(user) for user in users])
+
+    @classmethod
+    def build_id_number(cls, user):
+        """Return a new id number for the user, prefixed by their age group."""
+        return cls.build_id_numbers([user])[0]
+
+    @classmethod
+    def bulk_get_or_create(cls, users):
+        """
+        Attach an ID card to every user in ``users``.
+
+        Cards already loaded (e.g. through ``select_related('idcard')``) are
+        reused, the rest are fetched in one query and the missing ones are
+        created in a single ``bulk_create`` instead of one INSERT per user.
+        """
+        users = list(users)
+        pending = [user for user in users if not User.idcard.is_cached(user)]
+        if pending:
+            cards = {card.user_id: card for card in cls.objects.filter(user__in=pending)}
+            for user in pending:
+                if user.pk in cards:
+                    user.idcard = cards[user.pk]
+
+        missing = [user for user in users if User.idcard.related.get_cached_value(user, default=None) is None]
+        if missing:
+            cls.objects.bulk_create(
+                [
+                    cls(user=user, id_number=id_number)
+                    for user, id_number in zip(missing, cls.build_id_numbers(missing))
+                ],
+                ignore_conflicts=True,
+            )
+            # Re-read so cards created concurrently by another request are picked up too
+            cards = {card.user_id: card for card in cls.objects.filter(user__in=missing)}
+            for user in missing:
+                if user.pk in cards:
+                    user.idcard = cards[user.pk]
+        return users
+
+    @classmethod
+    def expire_overdue(cls, today=None):
+        """Flag every card past its expiry date as expired in one UPDATE, returns the count"""
+        from api.utils.card_verification import CardVerification
+
+        today = today or date.today()
+        cards = cls.objects.filter(expired=False, expired_at__lt=today)
+        # update() skips post_save, so the cached verification responses are dropped here
+        id_numbers = list(cards.values_list('id_number', flat=True))
+        count = cards.update(
+            expired=True,
+            updated_at=timezone.now(),
+        )
+        CardVerification.invalidate(*id_numbers)
+        return count
 
     # add a function to auto generate id_number based on user's age
     def save(self, *args, **kwargs):
         if not self.id_number:
-            # Get user's age from date_of_birth if available
-            age = None
-            if self.user.user_request and self.user.user_request.date_of_birth:
-                from datetime import date
-                dob = self.user.user_request.date_of_birth
-                today = date.today()
-                age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
-            
-            # Determine prefix based on age
-            # LYA for 31 years and above, LYY for 1-30 years
-            if age is not None and age >= 31:
-                prefix = 'LYA'
-            else:
-                prefix = 'LYY'  # Default to LYY if age is unknown or 1-30
-            
-            # Generate 7-digit random number
-            random_digits = str(random.randint(1000000, 9999999))
-            self.id_number = f'{prefix}{random_digits}'
-        
+            self.id_number = self.build_id_number(self.user)
+
         super().save(*args, **kwargs)
 
 
@@ -353,6 +497,9 @@ class UserRequest(models.Model):
         ordering = ['-created_at']
         verbose_name = 'User Request'
         verbose_name_plural = 'User Requests'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='userrequest_created_at_id_idx'),
+        ]
     
     def __str__(self):
         return f"Request by {self.first_name} - {self.status}"
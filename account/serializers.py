@@ -1,4 +1,5 @@
 import datetime
+from django.db.models import QuerySet
 from rest_framework import serializers
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
@@ -37,6 +38,22 @@ class IDCardSerializer(serializers.ModelSerializer):
 
     
 
+class UserListSerializer(serializers.ListSerializer):
+    """
+    Serialize many users without a query per row.
+
+    Querysets are eager loaded with the ID card and user request, and members
+    without a card get theirs created in one bulk insert.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if hasattr(data, 'all') else data
+        if isinstance(iterable, QuerySet):
+            iterable = UserSerializer.setup_eager_loading(iterable)
+        users = IDCard.bulk_get_or_create(iterable)
+        return [self.child.to_representation(user) for user in users]
+
+
 class UserSerializer(serializers.ModelSerializer):
     role = serializers.SerializerMethodField()
     card = serializers.SerializerMethodField(read_only=True)
@@ -47,10 +64,19 @@ class UserSerializer(serializers.ModelSerializer):
         model = User 
         fields = ['id', 'email', 'first_name', 'last_name', 'image', 'card','role', 'user_request','membership_type', 'password', 'created_at', 'is_active']
         extra_kwargs = {'password': {'write_only': True}}
+        list_serializer_class = UserListSerializer
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load everything the serializer reads in the same query as the users."""
+        return queryset.select_related('idcard', 'user_request')
 
     def get_card(self, obj: User):
         request = self.context.get('request')
-        id_card, created = IDCard.objects.get_or_create(user=obj)
+        try:
+            id_card = obj.idcard
+        except IDCard.DoesNotExist:
+            id_card, created = IDCard.objects.get_or_create(user=obj)
         return IDCardSerializer(id_card, context={'request': request}).data
 
     def get_role(self,obj:User):
@@ -0,0 +1,38 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from account.models import IDCard, User, UserRequest
+from api.utils.card_verification import CardVerification
+from api.utils.overview import MemberOverview
+
+
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=UserRequest)
+def invalidate_member_overview(sender, **kwargs):
+    """Drop the cached admin dashboard counts whenever a member changes"""
+    MemberOverview.invalidate()
+
+
+@receiver(pre_save, sender=IDCard)
+def remember_previous_id_number(sender, instance, update_fields=None, **kwargs):
+    """Keep the stored number so a renumbered card's old number stops verifying too"""
+    instance._previous_id_number = None
+    if instance._state.adding or (update_fields is not None and 'id_number' not in update_fields):
+        return
+    instance._previous_id_number = sender.objects.filter(pk=instance.pk).values_list('id_number', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=IDCard)
+def invalidate_card_verification(sender, instance, **kwargs):
+    """Drop the cached verification response for a changed card"""
+    CardVerification.invalidate(instance.id_number, getattr(instance, '_previous_id_number', None))
+
+
+@receiver(post_save, sender=User)
+def invalidate_member_card_verification(sender, instance, created=False, update_fields=None, **kwargs):
+    """Verification responses include the member's name, refresh them when it changes"""
+    if created:
+        return
+    if update_fields is not None and not {'first_name', 'last_name'} & set(update_fields):
+        return
+    CardVerification.invalidate(*IDCard.objects.filter(user=instance).values_list('id_number', flat=True))
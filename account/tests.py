@@ -1,3 +1,167 @@
-from django.test import TestCase
+import re
+from datetime import date, timedelta
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+
+from account.models import IDCard, IDNumberSequence, User
+from api.utils.card_verification import CardVerification
+from api.utils.member_import import MemberCSVImporter
+
+
+ID_NUMBER = re.compile(r'^LY[AY]\d{7}$')
+
+
+class IDNumberAllocationTests(TestCase):
+
+    def assertValidIdNumbers(self, id_numbers, count):
+        self.assertEqual(len(id_numbers), count)
+        self.assertEqual(len(set(id_numbers)), count)
+        for id_number in id_numbers:
+            self.assertRegex(id_number, ID_NUMBER)
+
+    def test_block_allocation_is_unique(self):
+        digits = IDCard.allocate_id_digits(5000)
+        self.assertEqual(len(set(digits)), 5000)
+        self.assertTrue(all(IDCard.ID_NUMBER_MIN <= number <= 9999999 for number in digits))
+        # The next block carries on from the sequence
+        self.assertFalse(set(digits) & set(IDCard.allocate_id_digits(100)))
+        self.assertEqual(IDNumberSequence.objects.get(name=IDCard.ID_NUMBER_SEQUENCE).last_value, 5100)
+
+    def test_legacy_numbers_are_skipped(self):
+        IDCard.allocate_id_digits(1)
+        last_value = IDNumberSequence.objects.get(name=IDCard.ID_NUMBER_SEQUENCE).last_value
+        next_digits = IDCard.ID_NUMBER_MIN + ((last_value + 1) * IDCard.ID_NUMBER_MULTIPLIER) % IDCard.ID_NUMBER_SPACE
+        legacy = IDCard.objects.create(user=User.objects.create(email='legacy@example.com'), id_number=f'LYY{next_digits}')
+
+        id_number, = IDCard.allocate_id_numbers(['LYY'])
+        self.assertNotEqual(id_number, legacy.id_number)
+        self.assertRegex(id_number, ID_NUMBER)
+
+    def test_bulk_get_or_create_gives_unique_numbers(self):
+        users = [User.objects.create(email=f'member{i}@example.com') for i in range(20)]
+        existing = IDCard.objects.create(user=users[0])
+
+        IDCard.bulk_get_or_create(users)
+
+        cards = list(IDCard.objects.filter(user__in=users))
+        self.assertValidIdNumbers([card.id_number for card in cards], 20)
+        self.assertEqual(users[0].idcard.id_number, existing.id_number)
+
+    def test_importer_gives_unique_numbers(self):
+        rows = ''.join(f'Member,{i},member{i}@example.com\n' for i in range(30))
+        importer = MemberCSVImporter(BytesIO(f'firstName,lastName,email\n{rows}'.encode('utf-8')), batch_size=7).run()
+
+        self.assertEqual(importer.created, 30)
+        self.assertValidIdNumbers(list(IDCard.objects.values_list('id_number', flat=True)), 30)
+
+
+
+class CardVerificationInvalidationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.card = IDCard.objects.create(
+            user=User.objects.create(email='member@example.com'),
+            id_number='OLD123',
+            is_active=True,
+            expired=False,
+            expired_at=date.today() + timedelta(days=1),
+        )
+
+    def test_renumbered_card_stops_verifying(self):
+        self.assertTrue(CardVerification.get('OLD123')['valid'])
+
+        call_command('update_id_numbers', stdout=StringIO())
+
+        self.assertFalse(CardVerification.get('OLD123')['valid'])
+        self.card.refresh_from_db()
+        self.assertTrue(CardVerification.get(self.card.id_number)['valid'])
+
+    def test_number_changed_with_save_stops_verifying(self):
+        self.assertTrue(CardVerification.get('OLD123')['valid'])
+
+        self.card.id_number = 'NEW123'
+        self.card.save()
+
+        self.assertFalse(CardVerification.get('OLD123')['valid'])
+        self.assertTrue(CardVerification.get('NEW123')['valid'])
+
+    def test_expire_overdue_drops_the_cached_response(self):
+        before = CardVerification.get('OLD123')['verifiedAt']
+
+        self.assertEqual(IDCard.expire_overdue(today=date.today() + timedelta(days=2)), 1)
+
+        self.assertIsNone(cache.get(CardVerification.CACHE_KEY.format('OLD123')))
+        self.assertGreater(CardVerification.get('OLD123')['verifiedAt'], before)
+
+
+class UpdateIdNumbersCommandTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        for i, id_number in enumerate(['OLD1', 'OLD2', 'LYA1234567', 'LYY7654321']):
+            IDCard.objects.create(user=User.objects.create(email=f'member{i}@example.com'), id_number=id_number)
+
+    def get_id_numbers(self):
+        return dict(IDCard.objects.values_list('user__email', 'id_number'))
+
+    def test_dry_run_changes_nothing(self):
+        before = self.get_id_numbers()
+        stdout = StringIO()
+        call_command('update_id_numbers', '--dry-run', stdout=stdout)
+        self.assertEqual(self.get_id_numbers(), before)
+        self.assertIn('Updated: 2', stdout.getvalue())
+
+    def test_workers_option_is_accepted(self):
+        call_command('update_id_numbers', '--workers', '2', '--batch-size', '2', stdout=StringIO())
+        id_numbers = self.get_id_numbers()
+        self.assertEqual(id_numbers['member2@example.com'], 'LYA1234567')
+        self.assertEqual(len(set(id_numbers.values())), 4)
+        for id_number in id_numbers.values():
+            self.assertRegex(id_number, ID_NUMBER)
+
+
+class DedupeIdNumbersMigrationTests(TransactionTestCase):
+    migrate_from = ('account', '0020_user_user_created_at_id_idx_and_more')
+    migrate_to = ('account', '0021_idnumbersequence')
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([target])
+        return executor.loader.project_state([target]).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        super().tearDown()
+
+    def test_duplicates_and_empty_numbers_are_renumbered(self):
+        apps = self.migrate(self.migrate_from)
+        User = apps.get_model('account', 'User')
+        IDCard = apps.get_model('account', 'IDCard')
+
+        def add_card(email, id_number):
+            return IDCard.objects.create(user=User.objects.create(email=email), id_number=id_number)
+
+        oldest = add_card('first@example.com', 'LYA1234567')
+        duplicate = add_card('second@example.com', 'LYA1234567')
+        empty = add_card('third@example.com', '')
+        unique = add_card('fourth@example.com', 'LYY7654321')
+
+        IDCard = self.migrate(self.migrate_to).get_model('account', 'IDCard')
+        id_numbers = dict(IDCard.objects.values_list('id', 'id_number'))
+
+        self.assertEqual(id_numbers[oldest.id], 'LYA1234567')
+        self.assertEqual(id_numbers[unique.id], 'LYY7654321')
+        self.assertTrue(id_numbers[duplicate.id].startswith('LYA'))
+        self.assertTrue(id_numbers[empty.id].startswith('LYY'))
+        self.assertEqual(len(set(id_numbers.values())), 4)
+        for id_number in id_numbers.values():
+            self.assertRegex(id_number, ID_NUMBER)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from api.models import Post, UpdateAttachment, StaffMember
+from api.models import BackgroundJob, Post, UpdateAttachment, StaffMember
 
 
 class UpdateAttachmentInline(admin.TabularInline):
@@ -26,3 +26,12 @@ class StaffMemberAdmin(admin.ModelAdmin):
     list_filter = ('category',)
     search_fields = ('name', 'position')
     ordering = ('category', 'order')
+
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ('job_type', 'status', 'processed_rows', 'total_rows', 'error_count', 'created_by', 'created_at')
+    list_filter = ('job_type', 'status')
+    readonly_fields = ('created_at', 'updated_at', 'started_at', 'finished_at')
+    ordering = ('-created_at',)
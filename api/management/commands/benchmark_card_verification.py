@@ -0,0 +1,57 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from account.models import IDCard
+from api.utils.card_verification import CardVerification
+from api.views.members import VerifyCardIdNumberView
+
+
+class Command(BaseCommand):
+    help = 'Measure id-verification requests/sec with and without the response cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=1000,
+            help='Number of lookups to run for each mode',
+        )
+        parser.add_argument(
+            '--id-number',
+            help='Card to look up, defaults to the first card in the database',
+        )
+
+    def run(self, id_number, total, cached):
+        factory = APIRequestFactory()
+        view = VerifyCardIdNumberView.as_view()
+        CardVerification.invalidate(id_number)
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(total):
+                if not cached:
+                    CardVerification.invalidate(id_number)
+                response = view(factory.get(f'/api/v1/id-verification/{id_number}'), id_number=id_number)
+                response.render()
+            elapsed = time.perf_counter() - started
+
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(
+            f'{"Cached" if cached else "Uncached"}: {total} requests in {elapsed:.2f}s '
+            f'({rate:.0f} req/s, {len(queries) / total:.2f} queries/request)'
+        )
+        return rate
+
+    def handle(self, *args, **options):
+        id_number = options['id_number'] or IDCard.objects.values_list('id_number', flat=True).first()
+        if not id_number:
+            raise CommandError('No ID cards found, pass --id-number or create a card first')
+
+        self.stdout.write(self.style.SUCCESS(f'Benchmarking verification of {id_number}...'))
+        uncached = self.run(id_number, options['requests'], cached=False)
+        cached = self.run(id_number, options['requests'], cached=True)
+        if uncached:
+            self.stdout.write(self.style.SUCCESS(f'Speedup: {cached / uncached:.1f}x'))
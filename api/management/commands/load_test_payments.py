@@ -0,0 +1,182 @@
+import math
+import queue
+import threading
+import time
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from account.models import User
+from api.utils.payment.paystack import Paystack
+from api.utils.payment.stub import PaystackStubServer
+from transaction.models import GatewayEvent, RevenueRollup, Transaction, WebhookEvent
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of ``values``"""
+    values = sorted(values)
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the membership payment flow (activation -> Paystack -> verify, optionally the webhook) '
+        'against the local Paystack stub and report latency percentiles and DB queries per call. '
+        'Creates throwaway members and removes them afterwards, do not run against production.'
+    )
+    email_domain = 'loadtest.invalid'
+    redirect_url = 'http://localhost/payment/done'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flows', type=int, default=200, help='Number of payment flows to run')
+        parser.add_argument('--concurrency', type=int, default=20, help='Flows running at the same time')
+        parser.add_argument('--latency', type=float, default=0.2, help='Stub seconds of delay per Paystack call')
+        parser.add_argument('--jitter', type=float, default=0.05, help='Stub extra random delay per call')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Share of stub calls answered with a 500')
+        parser.add_argument('--webhooks', action='store_true', help='Also deliver a signed webhook for every payment')
+        parser.add_argument('--keep-data', action='store_true', help="Don't delete the members and transactions created")
+        parser.add_argument('--force', action='store_true', help='Run even when DEBUG is off')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError('Refusing to create load-test data with DEBUG off, pass --force to run anyway')
+
+        self.results = {}
+        self.lock = threading.Lock()
+        self.webhooks = options['webhooks']
+
+        users = User.objects.bulk_create([
+            User(email=f'member{i}@{self.email_domain}', password='!') for i in range(options['flows'])
+        ])
+        stub = PaystackStubServer(
+            latency=options['latency'],
+            jitter=options['jitter'],
+            failure_rate=options['failure_rate'],
+        ).start()
+        self.stub = stub
+        Paystack.client.reset_metrics()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Running {options['flows']} payment flows, {options['concurrency']} at a time, against {stub.url}"
+        ))
+        try:
+            # The stub doesn't check the key, any value signs its webhooks
+            with override_settings(
+                PAYSTACK_BASE_URL=stub.url, PAYSTACK_SECRET_KEY=settings.PAYSTACK_SECRET_KEY or 'sk_test_loadtest',
+            ):
+                started = time.perf_counter()
+                self.run_workers(users, options['concurrency'])
+                elapsed = time.perf_counter() - started
+        finally:
+            stub.stop()
+            if not options['keep_data']:
+                self.cleanup()
+
+        self.report(elapsed, options['flows'])
+
+    def run_workers(self, users, concurrency):
+        pending = queue.Queue()
+        for user in users:
+            pending.put(user)
+
+        def work():
+            try:
+                while True:
+                    try:
+                        user = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    self.run_flow(user)
+            finally:
+                # Every worker thread has its own DB connection
+                connection.close()
+
+        workers = [threading.Thread(target=work) for _ in range(concurrency)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    def call(self, step, func):
+        """Time one request and count its queries, returns the response or None on failure"""
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            try:
+                response = func()
+                ok = response.status_code == 200
+            except Exception:
+                response, ok = None, False
+            elapsed = (time.perf_counter() - started) * 1000
+        with self.lock:
+            self.results.setdefault(step, []).append((elapsed, len(queries), ok))
+        return response if ok else None
+
+    def run_flow(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        started = time.perf_counter()
+
+        response = self.call('activate', lambda: client.post(
+            '/api/v1/membership/activation', {'redirect_url': self.redirect_url}, format='json'
+        ))
+        if response is None:
+            return
+        reference = response.data['data']['payment_url'].rsplit('/', 1)[-1]
+
+        if self.webhooks:
+            body, signature = self.stub.build_webhook(reference)
+            self.call('webhook', lambda: client.generic(
+                'POST', '/api/v1/payment/webhook/paystack', body,
+                content_type='application/json', HTTP_X_PAYSTACK_SIGNATURE=signature,
+            ))
+
+        if self.call('verify', lambda: client.post(
+            '/api/v1/payment/verify', {'trxn': reference}, format='json'
+        )) is not None:
+            with self.lock:
+                self.results.setdefault('flow', []).append(((time.perf_counter() - started) * 1000, 0, True))
+
+    def cleanup(self):
+        users = User.objects.filter(email__endswith=f'@{self.email_domain}')
+        transactions = Transaction.objects.filter(user__in=users)
+        references = [str(pk) for pk in transactions.values_list('id', flat=True)]
+        days = {
+            RevenueRollup.get_day(paid_at or created_at)
+            for paid_at, created_at in transactions.filter(status='success').values_list('paid_at', 'created_at')
+        }
+        WebhookEvent.objects.filter(event_key__in=[
+            f'paystack:charge.success:{self.stub.payments[reference]["id"]}'
+            for reference in references if 'id' in self.stub.payments.get(reference, {})
+        ]).delete()
+        GatewayEvent.objects.filter(reference__in=references).delete()
+        # Transactions and ID cards go with the members
+        users.delete()
+        # The payments were added to the rollups as they completed
+        if days:
+            call_command('rebuild_revenue_rollups', start_date=min(days), end_date=max(days), stdout=self.stdout)
+
+    def report(self, elapsed, flows):
+        self.stdout.write(self.style.SUCCESS('\n--- Results ---'))
+        self.stdout.write(f"{'step':<10}{'calls':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'queries':>9}")
+        for step in ('activate', 'webhook', 'verify', 'flow'):
+            rows = self.results.get(step)
+            if not rows:
+                continue
+            timings = [row[0] for row in rows]
+            errors = sum(1 for row in rows if not row[2])
+            queries = sum(row[1] for row in rows) / len(rows)
+            self.stdout.write(
+                f'{step:<10}{len(rows):>7}{errors:>8}{percentile(timings, 50):>10.1f}{percentile(timings, 95):>10.1f}'
+                f'{percentile(timings, 99):>10.1f}{max(timings):>10.1f}{queries if step != "flow" else 0:>9.1f}'
+            )
+
+        completed = len(self.results.get('flow', []))
+        self.stdout.write(f'\nCompleted {completed}/{flows} flows in {elapsed:.2f}s ({completed / elapsed:.1f} flows/s)')
+        for metric, stats in Paystack.client.get_metrics().items():
+            self.stdout.write(
+                f"Paystack {metric}: {stats['calls']} calls, {stats['errors']} errors, "
+                f"avg {stats['avg_ms']}ms, max {stats['max_ms']}ms"
+            )
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from api.utils.payment.stub import PaystackStubServer
+
+
+class Command(BaseCommand):
+    help = (
+        'Run a local stand-in for the Paystack API. '
+        'Start the app with PAYSTACK_BASE_URL set to the printed URL to use it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8099)
+        parser.add_argument('--latency', type=float, default=0.2, help='Seconds of delay per call')
+        parser.add_argument('--jitter', type=float, default=0.1, help='Up to this many extra seconds per call')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Share of calls answered with a 500')
+        parser.add_argument('--webhook-url', help='Post a signed charge.success webhook here after each initialize')
+
+    def handle(self, *args, **options):
+        server = PaystackStubServer(
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency'],
+            jitter=options['jitter'],
+            failure_rate=options['failure_rate'],
+            webhook_url=options['webhook_url'],
+            verbose=options['verbosity'] >= 2,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Paystack stub listening on {server.url}'))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
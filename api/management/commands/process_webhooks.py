@@ -0,0 +1,45 @@
+import time
+from django.core.management.base import BaseCommand
+
+from api.utils.webhooks import WebhookProcessor
+
+
+class Command(BaseCommand):
+    help = 'Apply stored payment webhook events to their transactions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process every pending event then exit instead of polling forever',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2,
+            help='Seconds to wait between polls when the queue is empty',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Number of events claimed per poll',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Waiting for webhook events...'))
+
+        while True:
+            events = WebhookProcessor.claim_batch(options['batch_size'])
+            if not events:
+                if options['once']:
+                    return
+                time.sleep(options['sleep'])
+                continue
+
+            for event in events:
+                event = WebhookProcessor.process(event)
+                if event.status == 'processed':
+                    self.stdout.write(f'{event.event_key}: {event.result}')
+                else:
+                    self.stdout.write(self.style.ERROR(f'{event.event_key} ({event.status}): {event.result}'))
@@ -0,0 +1,39 @@
+import time
+from django.core.management.base import BaseCommand
+
+from api.utils.jobs import JobRunner
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs such as bulk member imports.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run every pending job then exit instead of polling forever',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=5,
+            help='Seconds to wait between polls when the queue is empty',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Waiting for jobs...'))
+
+        while True:
+            job = JobRunner.claim_next()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['sleep'])
+                continue
+
+            self.stdout.write(f'Running {job.get_job_type_display()} job {job.id}')
+            job = JobRunner.run(job)
+            if job.status == 'completed':
+                self.stdout.write(self.style.SUCCESS(f'Job {job.id} completed: {job.message}'))
+            else:
+                self.stdout.write(self.style.ERROR(f'Job {job.id} failed: {job.message}'))
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_backgroundjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['category', 'created_at', 'id'], name='post_category_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_create_cache_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backgroundjob',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -25,6 +25,12 @@ class Post(models.Model):
     updated_at = models.DateTimeField(auto_now=True)        
     image = models.ImageField(upload_to='post-images')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='post_created_at_id_idx'),
+            models.Index(fields=['category', 'created_at', 'id'], name='post_category_created_idx'),
+        ]
+
 
 
 class UpdateAttachment(models.Model):
@@ -54,4 +60,58 @@ class StaffMember(models.Model):
         ordering = ['order', 'name']
 
     def __str__(self):
-        return f"{self.name} - {self.position}"
\ No newline at end of file
+        return f"{self.name} - {self.position}"
+
+class BackgroundJob(models.Model):
+    """Long running work (e.g. bulk imports) picked up by the run_jobs worker"""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+    JOB_TYPE_CHOICES = (
+        ('member_import', 'Member Import'),
+    )
+    # Only the first errors are kept on the row, error_count has the full number
+    MAX_STORED_ERRORS = 1000
+    # Claims before a job whose worker keeps dying is marked failed
+    MAX_ATTEMPTS = 3
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    job_type = models.CharField(max_length=50, choices=JOB_TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to='jobs/', null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+
+    # Progress
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    success_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    message = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='backgroundjob_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_job_type_display()} ({self.status})"
+
+    @property
+    def progress(self):
+        """Percentage of rows processed so far"""
+        if self.status == 'completed':
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(100, int(self.processed_rows * 100 / self.total_rows))
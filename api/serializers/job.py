@@ -0,0 +1,15 @@
+from rest_framework import serializers
+
+from api.models import BackgroundJob
+
+
+class BackgroundJobSerializer(serializers.ModelSerializer):
+    progress = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = BackgroundJob
+        fields = [
+            'id', 'job_type', 'status', 'attempts', 'progress', 'total_rows', 'processed_rows',
+            'success_count', 'error_count', 'errors', 'message',
+            'created_at', 'started_at', 'finished_at'
+        ]
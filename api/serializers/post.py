@@ -5,6 +5,9 @@ from django.core.files.base import ContentFile
 import base64
 import uuid
 
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Substr
+
 from api.models import Post, UpdateAttachment
 from api.utils.response.response_format import success_response
 
@@ -52,6 +55,65 @@ class PostListSerializer(serializers.ModelSerializer):
             data['image'] = full_url
 
         return data
+
+
+class PostFeedSerializer(serializers.ModelSerializer):
+    """
+    Compact post shape for the feed, the full content and attachments come from retrieve.
+
+    ``excerpt`` and ``attachment_count`` are computed by the database, see
+    ``setup_eager_loading``, so the content column and attachment rows are
+    never loaded.
+    """
+    EXCERPT_LENGTH = 200
+
+    excerpt = serializers.CharField(read_only=True)
+    attachment_count = serializers.IntegerField(read_only=True)
+    thumbnail = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Post
+        fields = ['id', 'title', 'excerpt', 'category', 'thumbnail', 'attachment_count', 'created_at', 'updated_at']
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        attachment_count = (
+            UpdateAttachment.objects.filter(post=OuterRef('pk'))
+            .order_by()
+            .values('post')
+            .annotate(count=Count('id'))
+            .values('count')
+        )
+        return (
+            queryset.prefetch_related(None)
+            .select_related('user')
+            .only('id', 'title', 'category', 'image', 'created_at', 'updated_at',
+                  'user__id', 'user__first_name', 'user__last_name')
+            .annotate(
+                excerpt=Substr('content', 1, PostFeedSerializer.EXCERPT_LENGTH),
+                attachment_count=Coalesce(Subquery(attachment_count, output_field=IntegerField()), 0),
+            )
+        )
+
+    def get_thumbnail(self, instance):
+        if not instance.image:
+            return None
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(instance.image.url)
+        return instance.image.url
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.user:
+            data['user'] = {
+                'id': instance.user.id,
+                'first_name': instance.user.first_name,
+                'last_name': instance.user.last_name,
+            }
+        return data
+
+
 class PostCreateUpdateSerializer(serializers.ModelSerializer):
     # Base64 file fields for creating/updating
     image_base64 = serializers.CharField(write_only=True, required=False, allow_blank=True)
@@ -0,0 +1,52 @@
+from rest_framework import serializers
+
+from api.utils.revenue import RevenueReport
+from transaction.models import Transaction
+
+
+class TransactionSerializer(serializers.ModelSerializer):
+    user_email = serializers.EmailField(source='user.email', read_only=True)
+
+    class Meta:
+        model = Transaction
+        fields = [
+            'id', 'user', 'user_email', 'amount', 'transaction_type', 'status',
+            'gateway_reference', 'channel', 'fees', 'paid_at', 'created_at', 'updated_at'
+        ]
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('user')
+
+
+class TransactionFilterSerializer(serializers.Serializer):
+    """Query parameters of the admin transaction listing"""
+    status = serializers.ChoiceField(choices=Transaction.AVAILABLE_STATUS, required=False)
+    transaction_type = serializers.CharField(max_length=10, required=False)
+    user = serializers.UUIDField(required=False)
+    email = serializers.EmailField(required=False)
+    reference = serializers.CharField(max_length=100, required=False)
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if attrs.get('start_date') and attrs.get('end_date') and attrs['start_date'] > attrs['end_date']:
+            raise serializers.ValidationError('start_date must be on or before end_date')
+        return attrs
+
+
+class RevenueQuerySerializer(serializers.Serializer):
+    period = serializers.ChoiceField(choices=list(RevenueReport.PERIODS), default='day')
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    category = serializers.CharField(max_length=20, required=False)
+
+    def validate(self, attrs):
+        default_start, default_end = RevenueReport.get_default_range(attrs['period'], attrs.get('end_date'))
+        attrs.setdefault('start_date', default_start)
+        attrs.setdefault('end_date', default_end)
+        if attrs['start_date'] > attrs['end_date']:
+            raise serializers.ValidationError('start_date must be on or before end_date')
+        if (attrs['end_date'] - attrs['start_date']).days > 366 * 5:
+            raise serializers.ValidationError('The date range can be at most five years')
+        return attrs
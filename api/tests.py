@@ -1,3 +1,377 @@
-from django.test import TestCase
+import asyncio
+import base64
+import json
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+import httpx
+import requests
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from account.models import User
+from api.models import BackgroundJob, Post, UpdateAttachment
+from api.utils.payment.client import GatewayClient
+from api.utils.payment.paystack import Paystack
+from api.utils.response.pagination import MAX_PAGE_SIZE, KeysetPaginator, Paginator, PaginatorCustom
+from api.utils.response.response_format import success_response
+from api.views.transaction import AsyncPaymentView
+
+
+class PaginatorConcurrencyTests(SimpleTestCase):
+    records = list(range(2000))
+
+    def get_request(self, page):
+        return Request(APIRequestFactory().get('/records/', {'page': page}))
+
+    def paginate(self, page, page_size):
+        response = Paginator(self.records, self.get_request(page)).paginate(page_size)
+        return page, page_size, response.data
+
+    def paginate_custom(self, page, page_size):
+        paginator = PaginatorCustom(
+            self.records, self.get_request(page),
+            serialize_func=lambda record, offset: record + offset,
+            func_param={'offset': 1},
+        )
+        return page, page_size, paginator.paginate(page_size).data
+
+    def run_concurrently(self, func):
+        jobs = [(page, page_size) for page_size in (5, 7, 10, 25, 50) for page in range(1, 21)] * 4
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            return list(pool.map(lambda job: func(*job), jobs))
+
+    def test_paginator_keeps_page_state_per_request(self):
+        for page, page_size, data in self.run_concurrently(self.paginate):
+            start = (page - 1) * page_size
+            self.assertEqual(data['metadata']['page'], page)
+            self.assertEqual(data['metadata']['page_size'], page_size)
+            self.assertEqual(data['results'], self.records[start:start + page_size])
+
+    def test_paginator_custom_keeps_page_state_per_request(self):
+        for page, page_size, data in self.run_concurrently(self.paginate_custom):
+            start = (page - 1) * page_size
+            self.assertEqual(data['metadata']['page'], page)
+            self.assertEqual(data['metadata']['page_size'], page_size)
+            self.assertEqual(data['results'], [record + 1 for record in self.records[start:start + page_size]])
+
+    def test_page_size_is_capped(self):
+        data = Paginator(self.records, self.get_request(1)).paginate(MAX_PAGE_SIZE * 10).data
+        self.assertEqual(data['metadata']['page_size'], MAX_PAGE_SIZE)
+        self.assertEqual(len(data['results']), MAX_PAGE_SIZE)
+
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.posts = [Post.objects.create(title=f'Post {i}', content='') for i in range(7)]
+
+    def paginate(self, cursor=None, page_size=3):
+        params = {'cursor': cursor} if cursor else {}
+        request = Request(APIRequestFactory().get('/posts/', params))
+        data = KeysetPaginator(
+            Post.objects.all(), request, serialize_page=lambda page: [post.title for post in page]
+        ).paginate(page_size).data
+        return data['results'], data['metadata']
+
+    @staticmethod
+    def get_cursor(link):
+        return parse_qs(urlparse(link).query)['cursor'][0] if link else None
+
+    def test_next_and_previous_links(self):
+        results, metadata = self.paginate()
+        self.assertEqual(results, ['Post 6', 'Post 5', 'Post 4'])
+        self.assertIsNone(metadata['previous'])
+
+        results, metadata = self.paginate(self.get_cursor(metadata['next']))
+        self.assertEqual(results, ['Post 3', 'Post 2', 'Post 1'])
+        middle = metadata
+
+        results, metadata = self.paginate(self.get_cursor(middle['next']))
+        self.assertEqual(results, ['Post 0'])
+        self.assertIsNone(metadata['next'])
+
+        # Going back from the last page returns the middle page again
+        results, metadata = self.paginate(self.get_cursor(metadata['previous']))
+        self.assertEqual(results, ['Post 3', 'Post 2', 'Post 1'])
+        results, metadata = self.paginate(self.get_cursor(metadata['previous']))
+        self.assertEqual(results, ['Post 6', 'Post 5', 'Post 4'])
+        self.assertIsNone(metadata['previous'])
+
+    def test_invalid_cursors_are_not_found(self):
+        def encode(raw):
+            return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+        for cursor in (
+            'not-base64!',
+            encode('f|2024-01-01T00:00:00+00:00|notauuid'),
+            encode('x|2024-01-01T00:00:00+00:00|' + str(self.posts[0].id)),
+            encode('f|yesterday|' + str(self.posts[0].id)),
+            encode('f|2024-01-01T00:00:00+00:00'),
+        ):
+            with self.subTest(cursor=cursor), self.assertRaises(NotFound):
+                self.paginate(cursor)
+
+    def test_tampered_cursor_is_a_404(self):
+        cursor = base64.urlsafe_b64encode(b'f|2024-01-01T00:00:00+00:00|notauuid').decode('ascii')
+        response = APIClient().get(reverse('posts-list'), {'cursor': cursor})
+        self.assertEqual(response.status_code, 404)
+
+
+class StubGatewayHandler(BaseHTTPRequestHandler):
+    """Answers with the queued status codes, then 200, and remembers each call"""
+    protocol_version = 'HTTP/1.1'
+
+    def respond(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        server.calls.append((self.command, self.path, self.client_address[1]))
+        if server.delay:
+            threading.Event().wait(server.delay)
+        status = server.statuses.pop(0) if server.statuses else 200
+        body = json.dumps({'status': status == 200}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = respond
+    do_POST = respond
+
+    def log_message(self, *args):
+        pass
+
+
+class StubGatewayServer(ThreadingHTTPServer):
+
+    def handle_error(self, request, client_address):
+        # Clients that timed out hang up before the stub answers
+        pass
+
+
+class StubGatewayMixin:
+    """Runs a stub gateway on a free port and points the ``stub`` and Paystack clients at it"""
+
+    def setUp(self):
+        self.server = StubGatewayServer(('127.0.0.1', 0), StubGatewayHandler)
+        self.server.calls = []
+        self.server.statuses = []
+        self.server.delay = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        settings = override_settings(
+            STUB_BASE_URL=base_url, STUB_BACKOFF=0, STUB_TIMEOUT=(1, 0.5), PAYSTACK_BASE_URL=base_url,
+            PAYSTACK_SECRET_KEY='sk_test_stub',
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = GatewayClient('stub')
+        self.addCleanup(self.client.close)
+
+
+class GatewayClientTests(StubGatewayMixin, SimpleTestCase):
+
+    def test_connections_are_reused(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get('/transaction/verify/1', metric='verify').status_code, 200)
+        self.assertEqual(len({port for _, _, port in self.server.calls}), 1)
+        self.assertEqual(self.client.get_metrics()['verify']['calls'], 5)
+
+    def test_get_is_retried_on_server_errors(self):
+        self.server.statuses = [503, 502]
+        self.assertEqual(self.client.get('/transaction/verify/1').status_code, 200)
+        self.assertEqual(len(self.server.calls), 3)
+
+    def test_post_is_not_retried_on_server_errors(self):
+        self.server.statuses = [503]
+        self.assertEqual(self.client.post('/transaction/initialize', json={}).status_code, 503)
+        self.assertEqual(len(self.server.calls), 1)
+
+    def test_slow_responses_time_out(self):
+        self.server.delay = 1
+        with self.assertRaises(requests.exceptions.RequestException):
+            self.client.post('/transaction/initialize', json={}, metric='initialize')
+        self.assertEqual(self.client.get_metrics()['initialize']['errors'], 1)
+
+
+class AsyncPaymentVerificationTests(StubGatewayMixin, SimpleTestCase):
+
+    async def verify_many(self, count):
+        from backend.asgi import application
+
+        transport = httpx.ASGITransport(app=application)
+        async with httpx.AsyncClient(transport=transport, base_url='http://testserver') as client:
+            responses = await asyncio.gather(*[
+                client.post('/api/v1/verify/donation/async', json={'trxn': str(i)}) for i in range(count)
+            ])
+        await Paystack.async_client.aclose()
+        return responses
+
+    def test_verifications_run_concurrently(self):
+        self.server.delay = 0.2
+        started = time.perf_counter()
+        responses = asyncio.run(self.verify_many(50))
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual({response.status_code for response in responses}, {200})
+        self.assertTrue(all(response.json()['status'] for response in responses))
+        self.assertEqual(len(self.server.calls), 50)
+        # 50 sequential calls would take 10s
+        self.assertLess(elapsed, 5)
+
+    def test_payment_verification_requires_authentication(self):
+        async def verify():
+            from backend.asgi import application
+
+            transport = httpx.ASGITransport(app=application)
+            async with httpx.AsyncClient(transport=transport, base_url='http://testserver') as client:
+                return await client.post('/api/v1/payment/verify/async', json={'trxn': '1'})
+
+        self.assertEqual(asyncio.run(verify()).status_code, 401)
+        self.assertEqual(self.server.calls, [])
+
+    def test_amounts_are_rendered_like_the_sync_views(self):
+        response = AsyncPaymentView.to_json_response(success_response(data={'amount': Decimal('500.00')}))
+        self.assertEqual(json.loads(response.content)['data']['amount'], 500.0)
+
+
+class PostFeedTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(email='author@example.com', first_name='Ada', last_name='Obi')
+        cls.posts = []
+        for i in range(5):
+            post = Post.objects.create(
+                user=cls.author, title=f'Post {i}', content='x' * 1000,
+                category='Events' if i % 2 else 'Announcements',
+            )
+            for j in range(i):
+                UpdateAttachment.objects.create(post=post, file=f'attachments/{i}-{j}.pdf')
+            cls.posts.append(post)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_feed_is_compact_and_cursor_paginated(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('posts-list'), {'page_size': 3})
+        self.assertEqual(response.status_code, 200)
+        page = response.data['data']
+        first = page['results'][0]
+        self.assertEqual(first['title'], 'Post 4')
+        self.assertEqual(first['attachment_count'], 4)
+        self.assertEqual(len(first['excerpt']), 200)
+        self.assertNotIn('content', first)
+        self.assertNotIn('attachments', first)
+
+        response = self.client.get(page['metadata']['next'])
+        self.assertEqual([post['title'] for post in response.data['data']['results']], ['Post 1', 'Post 0'])
+
+    def test_invalid_page_size_falls_back_to_the_default(self):
+        response = self.client.get(reverse('posts-list'), {'page_size': 'abc'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['data']['results']), 5)
+
+    def test_feed_filters_by_category(self):
+        response = self.client.get(reverse('posts-list'), {'category': 'Events'})
+        self.assertEqual([post['title'] for post in response.data['data']['results']], ['Post 3', 'Post 1'])
+
+    def test_retrieve_returns_full_content(self):
+        response = self.client.get(reverse('posts-detail', args=[self.posts[2].id]))
+        self.assertEqual(response.data['data']['content'], 'x' * 1000)
+        self.assertEqual(len(response.data['data']['attachments']), 2)
+
+
+class MemberImportJobTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email='admin@example.com', is_admin=True, is_staff=True)
+        User.objects.create(email='existing@example.com')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def upload(self, rows):
+        content = 'firstName,lastName,email\n' + ''.join(f'{row}\n' for row in rows)
+        file = SimpleUploadedFile('members.csv', content.encode('utf-8'), content_type='text/csv')
+        return self.client.post(reverse('AdminMembersBulkUploadView'), {'file': file}, format='multipart')
+
+    def get_job(self, job_id):
+        response = self.client.get(reverse('AdminJobDetailView', args=[job_id]))
+        self.assertEqual(response.status_code, 200)
+        return response.data['data']
+
+    def test_upload_is_imported_by_the_worker(self):
+        response = self.upload(['Ada,Obi,ada@example.com', 'Bola,Ade,existing@example.com', 'Chi,Eze,not-an-email'])
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data['data']['id']
+        self.assertEqual(self.get_job(job_id)['status'], 'pending')
+
+        call_command('run_jobs', '--once', stdout=StringIO())
+
+        job = self.get_job(job_id)
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual(job['progress'], 100)
+        self.assertEqual((job['total_rows'], job['success_count'], job['error_count']), (3, 1, 2))
+        self.assertEqual(sorted(error['row'] for error in job['errors']), [3, 4])
+        self.assertTrue(User.objects.filter(email='ada@example.com').exists())
+
+    def test_job_of_a_dead_worker_is_requeued(self):
+        job_id = self.upload(['Ada,Obi,ada@example.com']).data['data']['id']
+        stale = timezone.now() - timedelta(hours=1)
+        BackgroundJob.objects.filter(id=job_id).update(status='running', attempts=1, started_at=stale, updated_at=stale)
+
+        call_command('run_jobs', '--once', stdout=StringIO())
+
+        job = self.get_job(job_id)
+        self.assertEqual((job['status'], job['attempts']), ('completed', 2))
+
+    def test_job_is_failed_after_max_attempts(self):
+        job_id = self.upload(['Ada,Obi,ada@example.com']).data['data']['id']
+        stale = timezone.now() - timedelta(hours=1)
+        BackgroundJob.objects.filter(id=job_id).update(
+            status='running', attempts=BackgroundJob.MAX_ATTEMPTS, started_at=stale, updated_at=stale
+        )
+
+        call_command('run_jobs', '--once', stdout=StringIO())
+
+        self.assertEqual(self.get_job(job_id)['status'], 'failed')
+        self.assertFalse(User.objects.filter(email='ada@example.com').exists())
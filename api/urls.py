@@ -7,8 +7,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from account import views as account_views
 from api.views.category import CategoryListView, ChurchListView, YouthGroupListView
-from api.views.transaction import ActivateMembershipView, InitiateDonationPamentView, TotalMembersCountView, VerifyDonationPamentView, StartMembershipDemoView, VerifyPaymentView
-from api.views.members import  AdminAddMembersView,AdminGetSingleRequestView, AdminGetMemberOverview, AdminMemberRetrieveUpdateDestroyView, AdminMemberUpdateDestroyView, AdminMembersBulkUploadView, AdminUpdateRequestStatusView, AdminUserRequestListView, CreateUserRequestView, UserRequestDetailView, UserRequestListView, VerifyCardIdNumberView
+from api.views.transaction import ActivateMembershipView, AdminTransactionListView, AdminTransactionRevenueView, AsyncVerifyDonationPamentView, AsyncVerifyPaymentView, InitiateDonationPamentView, PaystackWebhookView, TotalMembersCountView, VerifyDonationPamentView, StartMembershipDemoView, VerifyPaymentView
+from api.views.members import  AdminAddMembersView,AdminGetSingleRequestView, AdminJobDetailView, AdminGetMemberOverview, AdminMemberRetrieveUpdateDestroyView, AdminMemberUpdateDestroyView, AdminMembersBulkUploadView, AdminUpdateRequestStatusView, AdminUserRequestListView, CreateUserRequestView, UserRequestDetailView, UserRequestListView, VerifyCardIdNumberView
 from api.views.set_password import AdminSetUserPasswordView
 from . import views
 from .views import post as post_view
@@ -41,6 +41,7 @@ urlpatterns = [
     path('admin/members/', AdminAddMembersView.as_view(), name='YouthGroupListView'),
     path('admin/members/overview', AdminGetMemberOverview.as_view(), name='AdminGetMemberOverview'),
     path('admin/members/upload', AdminMembersBulkUploadView.as_view(), name='AdminMembersBulkUploadView'),
+    path('admin/jobs/<uuid:pk>', AdminJobDetailView.as_view(), name='AdminJobDetailView'),
     path('admin/members/<id>', AdminMemberRetrieveUpdateDestroyView.as_view(), name='AdminMemberRetrieveUpdateDestroyView'), 
     path('admin/members/<id>/update', AdminMemberUpdateDestroyView.as_view(), name='AdminMemberUpdateDestroyView'), 
     path('admin/members/<user_id>/set_password/', AdminSetUserPasswordView.as_view(), name='admin-set-user-password'),
@@ -59,8 +60,14 @@ urlpatterns = [
     path('membership/demo', StartMembershipDemoView.as_view(), name='StartMembershipDemoView'),
     path('membership/activation', ActivateMembershipView.as_view(), name='ActivateMembershipView'),
     path('payment/verify', VerifyPaymentView.as_view(), name='VerifyPaymentView'), 
+    path('payment/verify/async', AsyncVerifyPaymentView.as_view(), name='AsyncVerifyPaymentView'),
+    path('payment/webhook/paystack', PaystackWebhookView.as_view(), name='PaystackWebhookView'),
     path('initiate/donation', InitiateDonationPamentView.as_view(), name='InitiateDonationPamentView'), 
     path('verify/donation', VerifyDonationPamentView.as_view(), name='VerifyDonationPamentView'), 
+    path('verify/donation/async', AsyncVerifyDonationPamentView.as_view(), name='AsyncVerifyDonationPamentView'),
+
+    path('admin/transactions', AdminTransactionListView.as_view(), name='AdminTransactionListView'),
+    path('admin/transactions/revenue', AdminTransactionRevenueView.as_view(), name='AdminTransactionRevenueView'),
 
     path('total-members-count', TotalMembersCountView.as_view(), name='TotalMembersCountView'), 
     
@@ -0,0 +1,65 @@
+from datetime import date
+from django.core.cache import cache
+
+from account.models import IDCard
+from account.serializers import IDCardSerializer
+
+
+class CardVerification:
+    """
+    Public ID card lookups used by the QR code scanners.
+
+    A lookup is a single query joining the card to its user and never writes:
+    the expired flag is worked out from ``expired_at`` when the response is
+    built. Responses, including misses, are cached per id number for
+    ``CACHE_TIMEOUT`` seconds and dropped whenever the card or its owner is
+    saved (see ``account.signals``). Set-based writes that skip the signals,
+    ``IDCard.expire_overdue`` and the update_id_numbers command, invalidate
+    the numbers they touch themselves. Saves happen in the web and worker
+    processes alike, so this needs the shared cache configured in ``CACHES``.
+    """
+    CACHE_KEY = 'id-verification:{}'
+    CACHE_TIMEOUT = 60
+
+    @classmethod
+    def get(cls, id_number):
+        key = cls.CACHE_KEY.format(id_number)
+        data = cache.get(key)
+        if data is None:
+            data = cls.build(id_number)
+            cache.set(key, data, cls.CACHE_TIMEOUT)
+        return data
+
+    @classmethod
+    def invalidate(cls, *id_numbers):
+        cache.delete_many([cls.CACHE_KEY.format(id_number) for id_number in id_numbers if id_number])
+
+    @staticmethod
+    def is_expired(card: IDCard, today=None):
+        return bool(card.expired_at and card.expired_at < (today or date.today()))
+
+    @classmethod
+    def build(cls, id_number):
+        card = IDCard.objects.select_related('user').filter(id_number=id_number).first()
+
+        # If card is not found
+        if not card:
+            return {
+                'valid': False,
+                'error': 'Card not found or invalid verification ID',
+                'cardId': id_number
+            }
+
+        # Only the response reflects the computed status, the row is left alone
+        card.expired = cls.is_expired(card)
+
+        response_data = IDCardSerializer(card).data
+        response_data['first_name'] = card.user.first_name
+        response_data['last_name'] = card.user.last_name
+
+        return dict(
+            valid=True,
+            data=response_data,
+            verifiedAt=card.updated_at,
+            expired=card.expired
+        )
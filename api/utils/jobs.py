@@ -0,0 +1,107 @@
+import logging
+import traceback
+from datetime import timedelta
+from django.db.models import F
+from django.utils import timezone
+
+from api.models import BackgroundJob
+from api.utils.member_import import MemberCSVImporter, MemberImportError
+from api.utils.overview import MemberOverview
+
+
+class JobRunner:
+    """
+    Runs queued BackgroundJob rows.
+
+    Jobs are claimed with a conditional UPDATE so several workers can poll
+    the same table without running a job twice. Each job type maps to a
+    ``run_<job_type>`` method that records its own progress on the job.
+
+    Progress saves keep ``updated_at`` fresh, so a running job that hasn't
+    been touched for ``stale_after`` lost its worker: it is put back in the
+    queue, and failed once it has been claimed ``MAX_ATTEMPTS`` times. A
+    requeued import starts over, rows it already created are reported as
+    existing members.
+    """
+    stale_after = timedelta(minutes=15)
+
+    @classmethod
+    def requeue_stale(cls):
+        """Requeue or fail running jobs whose worker stopped, returns ``(requeued, failed)``"""
+        now = timezone.now()
+        stale = BackgroundJob.objects.filter(status='running', updated_at__lt=now - cls.stale_after)
+        failed = stale.filter(attempts__gte=BackgroundJob.MAX_ATTEMPTS).update(
+            status='failed',
+            message='The worker running this job stopped responding',
+            finished_at=now,
+            updated_at=now,
+        )
+        requeued = stale.update(status='pending', started_at=None, updated_at=now)
+        return requeued, failed
+
+    @classmethod
+    def claim_next(cls):
+        """Mark the oldest pending job as running and return it, or None"""
+        cls.requeue_stale()
+        while True:
+            job = BackgroundJob.objects.filter(status='pending').order_by('created_at').first()
+            if job is None:
+                return None
+            now = timezone.now()
+            claimed = BackgroundJob.objects.filter(id=job.id, status='pending').update(
+                status='running',
+                attempts=F('attempts') + 1,
+                started_at=now,
+                updated_at=now,
+            )
+            if claimed:
+                job.refresh_from_db()
+                return job
+
+    @classmethod
+    def run(cls, job: BackgroundJob):
+        try:
+            getattr(cls, f'run_{job.job_type}')(job)
+            job.status = 'completed'
+        except Exception as e:
+            logging.error(e)
+            logging.error(traceback.format_exc())
+            job.status = 'failed'
+            job.message = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'message', 'finished_at', 'updated_at'])
+        return job
+
+    @staticmethod
+    def save_progress(job: BackgroundJob, importer: MemberCSVImporter, processed_rows):
+        job.processed_rows = processed_rows
+        job.success_count = importer.created
+        job.error_count = len(importer.errors)
+        job.errors = importer.errors[:BackgroundJob.MAX_STORED_ERRORS]
+        job.save(update_fields=['processed_rows', 'success_count', 'error_count', 'errors', 'updated_at'])
+
+    @classmethod
+    def run_member_import(cls, job: BackgroundJob):
+        """Import the job's CSV file, committing every batch as it goes"""
+        with job.file.open('rb') as file:
+            job.total_rows = sum(1 for _ in MemberCSVImporter.read_rows(file))
+            job.save(update_fields=['total_rows', 'updated_at'])
+
+            # Counting read the file to the end
+            file.seek(0)
+            importer = MemberCSVImporter(file)
+            processed_rows = 0
+            for batch in importer.batches():
+                try:
+                    # Each batch is its own transaction, a failure only loses that batch
+                    importer.import_batch(batch)
+                except MemberImportError as e:
+                    importer.add_error(batch[0][0], str(e))
+                processed_rows += len(batch)
+                cls.save_progress(job, importer, processed_rows)
+                # bulk_create skips the post_save signal, so drop the dashboard counts here
+                MemberOverview.invalidate()
+
+        job.message = f'Successfully uploaded {importer.created} members' + (
+            f' with {len(importer.errors)} errors' if importer.errors else ''
+        )
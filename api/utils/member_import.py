@@ -0,0 +1,127 @@
+import csv
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from account.models import IDCard, User
+
+
+class MemberImportError(Exception):
+    pass
+
+
+class MemberCSVImporter:
+    """
+    Import members from an uploaded CSV file.
+
+    The upload is decoded line by line instead of being read into memory, and
+    rows are handled in chunks of ``batch_size``: each chunk is validated with
+    a single lookup query, then users and their ID cards are written with one
+    ``bulk_create`` each.
+
+    The default password is hashed once per import and the hash is shared by
+    every member created by it, so the password hasher runs a single time
+    instead of once per row. Each import still gets its own random salt.
+    """
+    batch_size = 1000
+    default_password = 'YMCA123456789'
+
+    def __init__(self, file, batch_size=None):
+        self.file = file
+        self.batch_size = batch_size or self.batch_size
+        self.created = 0
+        self.errors = []
+        self.seen_emails = set()
+        self.password_hash = make_password(self.default_password)
+
+    @staticmethod
+    def read_rows(file):
+        """Yield ``(row_number, row)`` pairs, decoding the file incrementally"""
+        lines = (line.decode('utf-8-sig') for line in file)
+        reader = csv.DictReader(lines)
+        # Start from 2 to account for header row
+        for row_num, row in enumerate(reader, start=2):
+            yield row_num, row
+
+    def batches(self):
+        batch = []
+        for row in self.read_rows(self.file):
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def run(self):
+        for batch in self.batches():
+            self.import_batch(batch)
+        return self
+
+    def add_error(self, row_num, message):
+        self.errors.append({'row': row_num, 'errors': message})
+
+    @staticmethod
+    def clean_row(row):
+        """Map CSV fields to the essential User fields"""
+        return {
+            'first_name': (row.get('firstName') or row.get('first_name') or '').strip(),
+            'last_name': (row.get('lastName') or row.get('last_name') or '').strip(),
+            'email': User.objects.normalize_email((row.get('email') or '').strip()),
+        }
+
+    def validate_batch(self, rows):
+        """Return ``(row_number, member_data)`` for the rows that can be created"""
+        members = []
+        for row_num, row in rows:
+            member_data = self.clean_row(row)
+            email = member_data['email']
+            if not email:
+                self.add_error(row_num, 'Email address is required')
+                continue
+            try:
+                validate_email(email)
+            except ValidationError:
+                self.add_error(row_num, f'Invalid email address: {email}')
+                continue
+            if email in self.seen_emails:
+                self.add_error(row_num, f'Duplicate email in file: {email}')
+                continue
+            self.seen_emails.add(email)
+            members.append((row_num, member_data))
+
+        existing = set(
+            User.objects.filter(email__in=[member['email'] for _, member in members]).values_list('email', flat=True)
+        )
+        valid_members = []
+        for row_num, member in members:
+            if member['email'] in existing:
+                self.add_error(row_num, f"A user with this email already exists: {member['email']}")
+            else:
+                valid_members.append((row_num, member))
+        return valid_members
+
+    def build_user(self, member_data):
+        return User(password=self.password_hash, **member_data)
+
+    def import_batch(self, rows):
+        members = self.validate_batch(rows)
+        if not members:
+            return 0
+
+        users = [self.build_user(member_data) for _, member_data in members]
+        id_numbers = IDCard.build_id_numbers(users)
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+                IDCard.objects.bulk_create([
+                    IDCard(user=user, id_number=id_number) for user, id_number in zip(users, id_numbers)
+                ])
+        except IntegrityError:
+            raise MemberImportError(
+                f'Bulk upload failed, error creating users in rows {members[0][0]}-{members[-1][0]}'
+            )
+
+        self.created += len(users)
+        return len(users)
@@ -0,0 +1,79 @@
+import calendar
+from datetime import timedelta
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from account.models import Gender, User
+
+
+class MemberOverview:
+    """
+    Member statistics for the admin dashboard.
+
+    Every overview type is computed with a single conditional-aggregation
+    query and cached until a User or UserRequest changes
+    (see ``account.signals``). Invalidation happens in whichever process
+    made the change, so this relies on the shared cache configured in
+    ``CACHES``, a per-process LocMemCache would leave other workers stale.
+    """
+    CACHE_KEY = 'member-overview:{}'
+    CACHE_TIMEOUT = 60 * 5
+    OVERVIEW_TYPES = ('default', 'gender', 'month')
+    NEW_MEMBER_DAYS = 30
+
+    @staticmethod
+    def get_queryset():
+        return User.objects.filter(is_admin=False)
+
+    @classmethod
+    def get(cls, overview=None):
+        if overview not in cls.OVERVIEW_TYPES:
+            overview = 'default'
+
+        key = cls.CACHE_KEY.format(overview)
+        data = cache.get(key)
+        if data is None:
+            data = getattr(cls, f'get_{overview}_overview')()
+            cache.set(key, data, cls.CACHE_TIMEOUT)
+        return data
+
+    @classmethod
+    def invalidate(cls):
+        cache.delete_many([cls.CACHE_KEY.format(overview) for overview in cls.OVERVIEW_TYPES])
+
+    @classmethod
+    def get_default_overview(cls):
+        """Total, active, inactive and recently joined member counts"""
+        new_since = timezone.now() - timedelta(days=cls.NEW_MEMBER_DAYS)
+        return cls.get_queryset().aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_active=True)),
+            inactive=Count('id', filter=Q(is_active=False)),
+            new=Count('id', filter=Q(created_at__gte=new_since)),
+        )
+
+    @classmethod
+    def get_gender_overview(cls):
+        """Member counts per gender, read from the linked UserRequest"""
+        counts = cls.get_queryset().aggregate(**{
+            gender: Count('id', filter=Q(user_request__gender=gender))
+            for gender in Gender.values
+        })
+        return [{'name': gender, 'value': counts[gender]} for gender in Gender.values]
+
+    @classmethod
+    def get_month_overview(cls):
+        """New members per month for the current year"""
+        current_year = timezone.now().year
+        counts = cls.get_queryset().filter(created_at__year=current_year).aggregate(**{
+            str(month): Count('id', filter=Q(created_at__month=month))
+            for month in range(1, 13)
+        })
+        return [
+            {
+                'month': calendar.month_abbr[month],
+                'members': counts[str(month)]
+            }
+            for month in range(1, 13)
+        ]
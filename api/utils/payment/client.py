@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import threading
+import time
+import weakref
+import httpx
+from django.conf import settings
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+logger = logging.getLogger(__name__)
+
+
+class GatewayClient:
+    """
+    HTTP client shared by every call to one payment gateway.
+
+    A single ``requests.Session`` keeps TLS connections alive between calls,
+    every request gets a connect and read timeout, and failed connections
+    (plus 429/5xx answers to idempotent requests) are retried a bounded
+    number of times with exponential backoff. POSTs are only retried when
+    the connection could not be made, so a charge is never sent twice.
+
+    Settings are looked up as ``<NAME>_<SETTING>`` then
+    ``PAYMENT_GATEWAY_<SETTING>``, e.g. ``PAYSTACK_BASE_URL`` lets the
+    client run against a local stub server.
+    """
+    DEFAULT_TIMEOUT = (3.05, 15)
+    DEFAULT_RETRIES = 2
+    DEFAULT_BACKOFF = 0.3
+    DEFAULT_POOL_SIZE = 10
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, name, base_url=''):
+        self.name = name
+        self.default_base_url = base_url
+        self._session = None
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def get_setting(self, setting, default=None):
+        value = getattr(settings, f'{self.name.upper()}_{setting}', None)
+        if value is None:
+            value = getattr(settings, f'PAYMENT_GATEWAY_{setting}', default)
+        return value
+
+    @property
+    def base_url(self):
+        return self.get_setting('BASE_URL', self.default_base_url).rstrip('/')
+
+    @property
+    def timeout(self):
+        return self.get_setting('TIMEOUT', self.DEFAULT_TIMEOUT)
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self.build_session()
+        return self._session
+
+    def build_session(self):
+        retries = self.get_setting('RETRIES', self.DEFAULT_RETRIES)
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=self.get_setting('BACKOFF', self.DEFAULT_BACKOFF),
+            status_forcelist=self.RETRY_STATUSES,
+            raise_on_status=False,
+        )
+        pool_size = self.get_setting('POOL_SIZE', self.DEFAULT_POOL_SIZE)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session = Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def build_url(self, path):
+        if path.startswith(('http://', 'https://')):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method, path, metric=None, **kwargs):
+        """Send a request through the pooled session, ``metric`` names it in the latency stats"""
+        kwargs.setdefault('timeout', self.timeout)
+        metric = metric or f'{method.upper()} {path.split("?")[0]}'
+        started = time.perf_counter()
+        status = None
+        try:
+            response = self.session.request(method, self.build_url(path), **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.record(metric, elapsed, status)
+            logger.info('%s %s -> %s in %.1fms', self.name, metric, status or 'error', elapsed)
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def record(self, metric, elapsed, status):
+        failed = status is None or status >= 500
+        with self._lock:
+            stats = self._metrics.setdefault(metric, {'calls': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['calls'] += 1
+            stats['errors'] += failed
+            stats['total_ms'] += elapsed
+            stats['max_ms'] = max(stats['max_ms'], elapsed)
+
+    def get_metrics(self):
+        """Call count, error count and average/max latency (ms) per metric since start or the last reset"""
+        with self._lock:
+            return {
+                metric: {
+                    'calls': stats['calls'],
+                    'errors': stats['errors'],
+                    'avg_ms': round(stats['total_ms'] / stats['calls'], 2),
+                    'max_ms': round(stats['max_ms'], 2),
+                }
+                for metric, stats in self._metrics.items()
+            }
+
+    def reset_metrics(self):
+        with self._lock:
+            self._metrics = {}
+
+
+class AsyncGatewayClient(GatewayClient):
+    """
+    ``GatewayClient`` for async views, backed by an ``httpx.AsyncClient``.
+
+    An AsyncClient is bound to the event loop it was created in, so one is
+    kept per running loop: under ASGI that is a single pooled client shared
+    by every in-flight request. Only connection failures are retried, which
+    is safe for POSTs too. Timeouts, pool size and metrics are the same as
+    the sync client.
+    """
+    DEFAULT_MAX_CONNECTIONS = 200
+
+    def __init__(self, name, base_url=''):
+        super().__init__(name, base_url)
+        self._clients = weakref.WeakKeyDictionary()
+
+    def get_client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            connect, read = self.timeout
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(read, connect=connect),
+                limits=httpx.Limits(
+                    max_connections=self.get_setting('MAX_CONNECTIONS', self.DEFAULT_MAX_CONNECTIONS),
+                    max_keepalive_connections=self.get_setting('POOL_SIZE', self.DEFAULT_POOL_SIZE),
+                ),
+                transport=httpx.AsyncHTTPTransport(retries=self.get_setting('RETRIES', self.DEFAULT_RETRIES)),
+            )
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self):
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    async def request(self, method, path, metric=None, **kwargs):
+        metric = metric or f'{method.upper()} {path.split("?")[0]}'
+        started = time.perf_counter()
+        status = None
+        try:
+            response = await self.get_client().request(method, self.build_url(path), **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.record(metric, elapsed, status)
+            logger.info('%s %s -> %s in %.1fms', self.name, metric, status or 'error', elapsed)
+
+    async def get(self, path, **kwargs):
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request('POST', path, **kwargs)
@@ -1,4 +1,4 @@
-import logging, requests
+import logging
 import traceback
 from django.conf import settings
 from account.models import CodeConfirmation, User
@@ -6,6 +6,7 @@ from billing.models import Transaction
 from helper.utils.email.send_mail import Email
 from helper.utils.location.printscan import PrintScan
 from helper.utils.response.response_format import bad_request_response, success_response , internal_server_error_response
+from api.utils.payment.client import GatewayClient
 from identity.models.application import NationalIdentificationNumberApplication
 
 
@@ -14,6 +15,7 @@ class Flutterwave:
     """
     Flutterwave class that handles user payment via Flutterwave.
     """
+    client = GatewayClient('flutterwave', 'https://api.flutterwave.com/v3')
 
     @staticmethod
     def get_header():
@@ -64,10 +66,11 @@ class Flutterwave:
                 }
             }
 
-            response = requests.post(
-                "https://api.flutterwave.com/v3/payments",
+            response = Flutterwave.client.post(
+                "/payments",
                 json=data,
-                headers=Flutterwave.get_header()
+                headers=Flutterwave.get_header(),
+                metric='payments',
             )
             if response.ok:
                 response_data = response.json()
@@ -98,9 +101,10 @@ class Flutterwave:
     def validate_payment(request,transaction_id,redirect_url):
         try:
             # Call Flutterwave's API to verify the payment
-            response = requests.get(
-                f"https://api.flutterwave.com/v3/transactions/{transaction_id}/verify",
-                headers=Flutterwave.get_header()
+            response = Flutterwave.client.get(
+                f"/transactions/{transaction_id}/verify",
+                headers=Flutterwave.get_header(),
+                metric='verify',
             )
 
             if response.ok:
@@ -232,9 +236,10 @@ class Flutterwave:
         # Retrieve transaction using the flutterwave payment id
         try:
             # Call Flutterwave's API to verify the payment
-            response = requests.get(
-                f"https://api.flutterwave.com/v3/transactions/{transaction_id}/verify",
-                headers=Flutterwave.get_header()
+            response = Flutterwave.client.get(
+                f"/transactions/{transaction_id}/verify",
+                headers=Flutterwave.get_header(),
+                metric='verify',
             )
 
 
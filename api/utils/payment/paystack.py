@@ -1,14 +1,27 @@
 import datetime
-import requests
+import hashlib
+import hmac
+import logging
+from decimal import Decimal
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction as db_transaction
+from django.utils.dateparse import parse_datetime
 from account.models import IDCard
+from api.utils.payment.client import AsyncGatewayClient, GatewayClient
 from api.utils.response.response_format import bad_request_response, success_response
-from transaction.models import Transaction
+from transaction.models import RevenueRollup, Transaction
+
+logger = logging.getLogger(__name__)
 
 class Paystack:
     """
     Paystack class to handle payment-related tasks such as
     initiating transactions and verifying payments.
     """
+    client = GatewayClient('paystack', 'https://api.paystack.co')
+    async_client = AsyncGatewayClient('paystack', 'https://api.paystack.co')
 
     @staticmethod
     def next_may_31(reference_date: datetime.date | None = None) -> datetime.date:
@@ -25,7 +38,7 @@ class Paystack:
     @staticmethod
     def get_header():
         headers = {
-            "Authorization": f"Bearer sk_test_f2c4c12c87df60bc178d3be7a19ba4a975d17527",
+            "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
             "Content-Type": "application/json"
         }
         return headers
@@ -60,16 +73,16 @@ class Paystack:
                 "metadata": metadata,
             }
 
-            response = requests.post(
-                "https://api.paystack.co/transaction/initialize",
+            response = Paystack.client.post(
+                "/transaction/initialize",
                 json=data,
-                headers=Paystack.get_header()
+                headers=Paystack.get_header(),
+                metric='initialize',
             )
 
             if response.ok:
                 response_data = response.json()
                 if response.status_code == 200 and response_data["status"] == True:
-                    print(response_data['data'])
                     payment_url = response_data['data']['authorization_url']
                     return success_response(
                         data={"payment_url": payment_url},
@@ -109,16 +122,16 @@ class Paystack:
                 "metadata": metadata,
             }
 
-            response = requests.post(
-                "https://api.paystack.co/transaction/initialize",
+            response = Paystack.client.post(
+                "/transaction/initialize",
                 json=data,
-                headers=Paystack.get_header()
+                headers=Paystack.get_header(),
+                metric='initialize',
             )
-            print(response.text) 
+            logger.debug('Paystack initialize response: %s', response.text)
             if response.ok:
                 response_data = response.json()
                 if response.status_code == 200 and response_data["status"] == True:
-                    print(response_data['data'])
                     payment_url = response_data['data']['authorization_url']
                     return success_response(
                         data={"payment_url": payment_url},
@@ -132,70 +145,81 @@ class Paystack:
             return bad_request_response(message=str(e))
 
 
+    @staticmethod
+    def mark_transaction_successful(transaction, data, source='verify'):
+        """Mark a locked transaction as paid and activate the member's ID card"""
+        transaction.status = "success"
+        transaction.set_gateway_payload(data, source)
+        id_card, created = IDCard.objects.get_or_create(user=transaction.user)
+        id_card.is_active =True
+        id_card.first_time =False
+        id_card.expired = False
+        # Expire on May 31st of the following year from payment date
+        id_card.expired_at = Paystack.next_may_31()
+        id_card.save()
+        transaction.save()
+        RevenueRollup.add_transaction(transaction)
+
+    @staticmethod
+    def apply_verification(response_data):
+        """Update the transaction and ID card from a successful Paystack verify response"""
+        payment_status = response_data['data']['status']
+        system_tx_ref = response_data['data']['reference']
+
+        with db_transaction.atomic():
+            # Lock the row so a webhook for the same payment can't apply it at the same time
+            try:
+                transaction = Transaction.objects.select_for_update().get(id=system_tx_ref)
+            except:
+                return bad_request_response(
+                    message="Transaction not found."
+                )
+
+            # Update the transaction based on the payment status
+            if payment_status == "success":
+                if transaction.status == 'success':
+                    return success_response(
+                        message="Transaction already successful.",
+                        data={
+                            "transaction_id": str(transaction.id),
+                            "success":True,
+                            "amount": transaction.amount,
+                            "message": "Transaction already successful."
+                        }
+                    )
+                Paystack.mark_transaction_successful(transaction, response_data['data'])
+                return success_response(
+                    message="Payment successful.",
+                    data={
+                        "transaction_id": str(transaction.id),
+                        "success":True,
+                        "amount": transaction.amount,
+                        "message": "Payment successful."
+                    }
+                )
+
+            elif payment_status == "failed":
+                transaction.status = "failed"
+                transaction.set_gateway_payload(response_data['data'], 'verify')
+                transaction.save()
+                return bad_request_response(message="Payment not successful.")
+            else:
+                return bad_request_response(message='Payment still processing')
+
     @staticmethod
     def validate_payment(transaction_id):
         try:
             # Verify payment with Paystack
-            response = requests.get(
-                f"https://api.paystack.co/transaction/verify/{transaction_id}",
-                headers=Paystack.get_header()
+            response = Paystack.client.get(
+                f"/transaction/verify/{transaction_id}",
+                headers=Paystack.get_header(),
+                metric='verify',
             )
             if response.ok:
                 response_data = response.json()
                 # print(response_data)
                 if response.status_code == 200 and response_data["status"] in ["success",True]:
-                    payment_status = response_data['data']['status']
-                    system_tx_ref = response_data['data']['reference']
-                    
-                    try:
-                        transaction = Transaction.objects.get(id=system_tx_ref)
-                    except:
-                        return bad_request_response(
-                            message="Transaction not found."
-                        )
-
-                    # Update the transaction based on the payment status
-                    if payment_status == "success":
-                        if transaction.status == 'success':
-                            return success_response(
-                                message="Transaction already successful.",
-                                data={
-                                    "transaction_id": str(transaction.id),
-                                    "success":True,
-                                    "amount": transaction.amount,
-                                    "message": "Transaction already successful."
-                                }
-                            )
-                        if transaction.status != "success":
-                            transaction.status = "success"
-                            transaction.response = response_data['data']
-                            id_card, created = IDCard.objects.get_or_create(user=transaction.user)
-                            id_card.is_active =True
-                            id_card.first_time =False
-                            id_card.expired = False
-                            # Expire on May 31st of the following year from payment date
-                            id_card.expired_at = Paystack.next_may_31()
-                            id_card.save()
-                            transaction.save()
-                            return success_response(
-                                message="Payment successful.",
-                                data={
-                                    "transaction_id": str(transaction.id),
-                                    "success":True,
-                                    "amount": transaction.amount,
-                                    "message": "Payment successful."
-                                }
-                            )
-                  
-                        return success_response(message="Payment successful.")
-
-                    elif payment_status == "failed":
-                        transaction.status = "failed"
-                        transaction.response = response_data['data']
-                        transaction.save()
-                        return bad_request_response(message="Payment not successful.")
-                    else:
-                        return bad_request_response(message='Payment still processing')
+                    return Paystack.apply_verification(response_data)
 
                 return bad_request_response(message="Payment verification failed.")
 
@@ -206,15 +230,39 @@ class Paystack:
         except Exception as e:
             print(e)
             return bad_request_response(message='Unable to verify payment at the moment')
+
+    @staticmethod
+    async def avalidate_payment(transaction_id):
+        """Async ``validate_payment``, the worker isn't blocked while Paystack answers"""
+        try:
+            response = await Paystack.async_client.get(
+                f"/transaction/verify/{transaction_id}",
+                headers=Paystack.get_header(),
+                metric='verify',
+            )
+            if response.is_success:
+                response_data = response.json()
+                if response.status_code == 200 and response_data["status"] in ["success",True]:
+                    # The ORM is sync only, run the DB updates in the sync thread
+                    return await sync_to_async(Paystack.apply_verification)(response_data)
+
+                return bad_request_response(message="Payment verification failed.")
+
+            return bad_request_response(message='Failed to verify payment.')
+
+        except Exception:
+            logger.exception('Unable to verify payment %s', transaction_id)
+            return bad_request_response(message='Unable to verify payment at the moment')
         
 
     @staticmethod
     def validate_payment_donation(transaction_id):
         try:
             # Verify payment with Paystack
-            response = requests.get(
-                f"https://api.paystack.co/transaction/verify/{transaction_id}",
-                headers=Paystack.get_header()
+            response = Paystack.client.get(
+                f"/transaction/verify/{transaction_id}",
+                headers=Paystack.get_header(),
+                metric='verify',
             )
             if response.ok:
                 response_data = response.json()
@@ -234,67 +282,130 @@ class Paystack:
 
 
     @staticmethod
-    def process_webhook(payload):
+    async def avalidate_payment_donation(transaction_id):
+        """Async ``validate_payment_donation``"""
         try:
-            transaction_id = payload['data']['reference']
-            payment_status = payload['data']['status']
-
-            # Call Paystack to verify the payment
-            response = requests.get(
-                f"https://api.paystack.co/transaction/verify/{transaction_id}",
-                headers=Paystack.get_header()
+            response = await Paystack.async_client.get(
+                f"/transaction/verify/{transaction_id}",
+                headers=Paystack.get_header(),
+                metric='verify',
             )
-
-            if response.ok:
+            if response.is_success:
                 response_data = response.json()
-                if response.status_code == 200 and response_data["status"] == "success":
-                    payment_status = response_data['data']['status']
-                    system_tx_ref = response_data['data']['reference']
-
-                    transaction = Transaction.objects.get(id=system_tx_ref)
+                if response.status_code == 200 and response_data["status"] in ["success",True]:
 
-                    # Update the transaction based on the payment status
-                    if payment_status == "success":
-                        if transaction.status == 'success':
-                            return success_response(
+                    return success_response(
                                 message="Transaction already successful.",
-                                data={"message": "Transaction already successful."}
-                            )
-                        if transaction.status != "success":
-                            transaction.status = "success"
-                            transaction.response = response_data['data']
-                            id_card, created = IDCard.objects.get_or_create(user=transaction.user)
-                            id_card.is_active =True
-                            id_card.expired = False
-                            # Expire on May 31st of the following year from payment date
-                            id_card.expired_at = Paystack.next_may_31()
-                            id_card.save()
-                            transaction.save()
-                            return success_response(
-                                message="Payment successful.",
-                                data={
-                                    "transaction_id": str(transaction.id),
-                                    "amount": transaction.amount,
-                                    "message": "Payment successful."
-                                }
-                            )
-                  
-                        return success_response(message="Payment successful.")
-
-                    elif payment_status == "failed":
-                        transaction.status = "failed"
-                        transaction.response = response_data['data']
-                        transaction.save()
-                        return bad_request_response(message="Payment not successful.")
-                    else:
-                        return bad_request_response(message='Payment still processing')
-
+                    )
                 return bad_request_response(message="Payment verification failed.")
-
             return bad_request_response(message='Failed to verify payment.')
+        except Exception:
+            logger.exception('Unable to verify payment %s', transaction_id)
+            return bad_request_response(message='Unable to verify payment at the moment')
+        
 
-        except Transaction.DoesNotExist:
-            return bad_request_response(message="Transaction not found.")
-        except Exception as e:
-            return bad_request_response(message=str(e))
 
+    @staticmethod
+    def verify_webhook_signature(body: bytes, signature):
+        """Check the ``x-paystack-signature`` header, an HMAC-SHA512 of the raw body"""
+        if not settings.PAYSTACK_SECRET_KEY:
+            logger.error('PAYSTACK_SECRET_KEY is not set, rejecting webhook')
+            return False
+        if not signature:
+            return False
+        expected = hmac.new(settings.PAYSTACK_SECRET_KEY.encode('utf-8'), body, hashlib.sha512).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
+    @staticmethod
+    def get_webhook_event_key(payload):
+        """Key shared by every delivery of the same event, used to drop retries"""
+        data = payload.get('data') or {}
+        return f"paystack:{payload.get('event')}:{data.get('id') or data.get('reference')}"
+
+    @staticmethod
+    def add_donation_revenue(data):
+        paid_at = data.get('paid_at') or data.get('paidAt')
+        RevenueRollup.add(
+            RevenueRollup.get_day(parse_datetime(paid_at) if isinstance(paid_at, str) else None),
+            RevenueRollup.DONATION,
+            Decimal(int(data.get('amount') or 0)) / 100,
+            payment_method='paystack',
+        )
+
+    @staticmethod
+    def verify_charge(reference):
+        """Return the charge data from Paystack's verify API, raises ValueError when it can't be confirmed"""
+        response = Paystack.client.get(
+            f"/transaction/verify/{reference}",
+            headers=Paystack.get_header(),
+            metric='verify',
+        )
+        response_data = response.json() if response.ok else {}
+        if response_data.get('status') not in ['success', True] or not response_data.get('data'):
+            raise ValueError(f"Paystack could not verify {reference} ({response.status_code})")
+        return response_data['data']
+
+    @staticmethod
+    def is_donation(data):
+        return (data.get('metadata') or {}).get('payment_mode') == 'donation'
+
+    @staticmethod
+    def process_webhook(payload):
+        """
+        Apply a stored, signature checked webhook to its transaction.
+
+        The webhook only says which charge changed, its status and amount
+        are read back from the verify API before anything is applied. The
+        transaction row is locked while its status changes, which makes a
+        repeated event or a concurrent verify call a no-op. Returns a short
+        description of what was done.
+        """
+        event = payload.get('event')
+        data = payload.get('data') or {}
+        reference = data.get('reference')
+        if event not in ('charge.success', 'charge.failed'):
+            return f'Ignored {event} event'
+        if Paystack.is_donation(data):
+            if event != 'charge.success':
+                return 'Ignored donation'
+        else:
+            try:
+                transaction = Transaction.objects.filter(id=reference).only('status').first()
+            except ValidationError:
+                transaction = None
+            if transaction is None:
+                return f"Transaction {reference} not found"
+            if transaction.status == 'success':
+                return 'Transaction already successful'
+
+        amount = data.get('amount')
+        data = Paystack.verify_charge(reference)
+        if Paystack.is_donation(data):
+            # Donations have no transaction row, the rollup is added to once per processed event
+            if data.get('status') != 'success':
+                return 'Donation not successful'
+            # rebuild_revenue_rollups reads the amount from the stored webhook
+            if int(amount or 0) != int(data.get('amount') or 0):
+                raise ValueError(f"Amount {amount} does not match donation {reference}")
+            Paystack.add_donation_revenue(data)
+            return 'Donation recorded'
+
+        with db_transaction.atomic():
+            transaction = Transaction.objects.select_for_update().get(id=reference)
+            if transaction.status == 'success':
+                return 'Transaction already successful'
+
+            if data.get('status') == 'failed':
+                transaction.status = "failed"
+                transaction.set_gateway_payload(data, 'webhook')
+                transaction.save()
+                return 'Transaction marked as failed'
+            if data.get('status') != 'success':
+                # Retried later by the worker
+                raise ValueError(f"Payment {reference} is still {data.get('status')}")
+
+            # Amounts are sent in kobo
+            if int(data.get('amount') or 0) != int(transaction.amount * 100):
+                raise ValueError(f"Amount {data.get('amount')} does not match transaction {transaction.id}")
+            Paystack.mark_transaction_successful(transaction, data, 'webhook')
+            return 'Transaction marked as successful'
@@ -3,12 +3,12 @@ from billing.models import Transaction
 import stripe
 import logging
 import traceback
-import requests
 from django.conf import settings
 from helper.utils.email.send_mail import Email
 from helper.utils.location.printscan import PrintScan
 from helper.utils.response.response_format import internal_server_error_response, success_response , bad_request_response, verification_success_response
 from identity.models.application import NationalIdentificationNumberApplication
+from api.utils.payment.client import GatewayClient
 
 
 
@@ -17,6 +17,7 @@ class Stripe:
     Stripe class that handle customer creation, payment,
     recurring and canceled recurring payment
     """
+    client = GatewayClient('stripe')
 
     @staticmethod
     def charge_user1(*args,**kwargs):
@@ -251,7 +252,7 @@ class Stripe:
             url = 'https://eoc3cqj60djento.m.pipedream.net'
             if request.method == 'POST':
                 payload = request.body
-                webhook_send_request = requests.post(url,data=payload)
+                webhook_send_request = Stripe.client.post(url, data=payload, metric='webhook_forward')
                 print(webhook_send_request.status_code)
         except Exception as e:
             logging.error(e)
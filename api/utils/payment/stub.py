@@ -0,0 +1,165 @@
+import hashlib
+import hmac
+import itertools
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.conf import settings
+
+from api.utils.payment.client import GatewayClient
+
+
+class PaystackStubHandler(BaseHTTPRequestHandler):
+    """Answers the Paystack endpoints the app uses, see PaystackStubServer"""
+    protocol_version = 'HTTP/1.1'
+    verify_path = re.compile(r'^/transaction/verify/(?P<reference>[^/?]+)')
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return {}
+
+    def simulate_network(self):
+        """Sleep for the configured latency, returns True when this call should fail"""
+        server = self.server
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay:
+            time.sleep(delay)
+        return random.random() < server.failure_rate
+
+    def do_POST(self):
+        payload = self.read_json()
+        if self.path.split('?')[0] != '/transaction/initialize':
+            return self.send_json(404, {'status': False, 'message': 'Not found'})
+        if self.simulate_network():
+            return self.send_json(500, {'status': False, 'message': 'Stub failure'})
+
+        reference = payload.get('reference') or uuid.uuid4().hex
+        self.server.payments[reference] = {
+            'amount': int(payload.get('amount') or 0),
+            'email': payload.get('email'),
+            'metadata': payload.get('metadata') or {},
+        }
+        self.send_json(200, {
+            'status': True,
+            'message': 'Authorization URL created',
+            'data': {
+                'authorization_url': f'{self.server.url}/checkout/{reference}',
+                'access_code': uuid.uuid4().hex[:15],
+                'reference': reference,
+            },
+        })
+        if self.server.webhook_url:
+            threading.Thread(target=self.server.send_webhook, args=(reference,), daemon=True).start()
+
+    def do_GET(self):
+        match = self.verify_path.match(self.path)
+        if not match:
+            return self.send_json(404, {'status': False, 'message': 'Not found'})
+        if self.simulate_network():
+            return self.send_json(500, {'status': False, 'message': 'Stub failure'})
+
+        reference = match.group('reference')
+        if reference not in self.server.payments:
+            return self.send_json(400, {'status': False, 'message': 'Transaction reference not found'})
+        self.send_json(200, {
+            'status': True,
+            'message': 'Verification successful',
+            'data': self.server.build_charge(reference),
+        })
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class PaystackStubServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the Paystack API, for load tests and manual runs.
+
+    Serves ``/transaction/initialize`` and ``/transaction/verify/<ref>``
+    with ``latency`` (+ up to ``jitter``) seconds of delay per call and a
+    ``failure_rate`` share of 500 responses. Every initialized payment
+    verifies as a successful card charge with 1.5% fees, tests can add
+    entries to ``payments`` directly. With ``webhook_url`` set, a signed
+    ``charge.success`` webhook is posted there after each initialize.
+    Point the app at it with the ``PAYSTACK_BASE_URL`` setting.
+    """
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, failure_rate=0.0,
+                 webhook_url=None, verbose=False):
+        super().__init__((host, port), PaystackStubHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.webhook_url = webhook_url
+        self.verbose = verbose
+        self.payments = {}
+        self.charge_ids = itertools.count(1)
+        self.webhook_client = GatewayClient('paystack_stub_webhook')
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self.webhook_client.close()
+
+    def build_charge(self, reference):
+        payment = self.payments[reference]
+        return {
+            'id': payment.setdefault('id', next(self.charge_ids)),
+            'status': 'success',
+            'reference': reference,
+            'amount': payment['amount'],
+            'currency': 'NGN',
+            'channel': 'card',
+            'fees': payment['amount'] * 15 // 1000,
+            'paid_at': payment.setdefault('paid_at', datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')),
+            'customer': {'email': payment['email']},
+            'metadata': payment['metadata'],
+        }
+
+    def build_webhook(self, reference):
+        """Return the body and signature of a ``charge.success`` webhook"""
+        body = json.dumps({'event': 'charge.success', 'data': self.build_charge(reference)}).encode('utf-8')
+        signature = hmac.new(settings.PAYSTACK_SECRET_KEY.encode('utf-8'), body, hashlib.sha512).hexdigest()
+        return body, signature
+
+    def send_webhook(self, reference):
+        body, signature = self.build_webhook(reference)
+        try:
+            self.webhook_client.post(
+                self.webhook_url,
+                data=body,
+                headers={'Content-Type': 'application/json', 'x-paystack-signature': signature},
+                metric='webhook',
+            )
+        except Exception as e:
+            logging.error(f'Stub webhook for {reference} failed: {e}')
@@ -1,8 +1,34 @@
+import base64
+import hashlib
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+MAX_PAGE_SIZE = 500
+
+
+def clamp_page_size(no_of_record, max_page_size=MAX_PAGE_SIZE):
+    """Return the requested page size bounded to ``1..max_page_size``."""
+    return max(1, min(int(no_of_record), max_page_size))
+
+
+def parse_page_size(value, default):
+    """``page_size`` from a query string, ``default`` when it isn't a whole number."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
 
 
 class CustomPagination(PageNumberPagination):
+    max_page_size = MAX_PAGE_SIZE
+
     def get_paginated_response(self, data, is_filter=False):
         return Response({
             'metadata': {
@@ -18,18 +44,27 @@ class CustomPagination(PageNumberPagination):
         })
 
 class Paginator:
-    paginator = CustomPagination()
 
-    def __init__(self, records, request):
+    def __init__(self, records, request, serialize_page=None):
         """
         Method that paginate all the records
+        :param records: The queryset or list of records to paginate
+        :param request: The request object for pagination context
+        :param serialize_page: Optional callable that serializes the records of
+            the current page, so a queryset is sliced with LIMIT/OFFSET before
+            anything is serialized
         """
+        # One pagination object per paginator, paginate() mutates its page state
+        self.paginator = CustomPagination()
         self.records = records
         self.request = request
+        self.serialize_page = serialize_page
 
     def paginate(self, no_of_record: int):
-        self.paginator.page_size = no_of_record
+        self.paginator.page_size = clamp_page_size(no_of_record, self.paginator.max_page_size)
         result_page = self.paginator.paginate_queryset(self.records, self.request)
+        if self.serialize_page is not None:
+            result_page = self.serialize_page(result_page)
         return self.paginator.get_paginated_response(result_page)
     
 
@@ -37,7 +72,6 @@ class Paginator:
 
 
 class PaginatorCustom:
-    paginator = CustomPagination()
 
     def __init__(self, records, request, serialize_func, func_param={}, is_filter=False):
         """
@@ -46,6 +80,7 @@ class PaginatorCustom:
         :param request: The request object for pagination context
         :param serialize_func: A callable function that handles serialization for each record
         """
+        self.paginator = CustomPagination()
         self.records = records
         self.request = request
         self.serialize_func = serialize_func 
@@ -57,10 +92,151 @@ class PaginatorCustom:
         Paginate the records based on the provided page size.
         :param no_of_record: The number of records per page
         """
-        self.paginator.page_size = no_of_record
+        self.paginator.page_size = clamp_page_size(no_of_record, self.paginator.max_page_size)
         result_page = self.paginator.paginate_queryset(self.records, self.request)
 
-        print(len(result_page))
         # Apply the dynamic serialization function to each record in the paginated result
         serialized_data = [self.serialize_func(record,**self.func_param) for record in result_page]
         return self.paginator.get_paginated_response(serialized_data, self.is_filter)
+
+
+
+
+class KeysetPagination:
+    """
+    Cursor pagination keyed on ``(created_at, id)``, newest first.
+
+    Every page is a single indexed range scan no matter how deep the client
+    scrolls. The total count is only computed when ``with_count=true`` is
+    passed, and is then cached for ``count_cache_timeout`` seconds.
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'with_count'
+    count_cache_timeout = 60
+    max_page_size = MAX_PAGE_SIZE
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.page_size = 10
+        self.request = None
+        self.cursor = None
+        self.count = None
+        self.has_records = False
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    def encode_cursor(self, record, reverse=False):
+        created_at, pk = self.get_position(record)
+        raw = f"{'r' if reverse else 'f'}|{created_at.isoformat()}|{pk}"
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, token, model=None):
+        """Return ``(reverse, created_at, pk)``, the pk is converted with ``model``'s pk field when given"""
+        try:
+            direction, created_at, pk = base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8').split('|')
+            created_at = parse_datetime(created_at)
+            if model is not None:
+                pk = model._meta.pk.to_python(pk)
+        except (TypeError, ValueError, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if direction not in ('f', 'r') or created_at is None or pk in (None, ''):
+            raise NotFound(self.invalid_cursor_message)
+        return direction == 'r', created_at, pk
+
+    @staticmethod
+    def get_position(record):
+        if isinstance(record, dict):
+            return record['created_at'], record['id']
+        return record.created_at, record.pk
+
+    def get_count(self, queryset):
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        key = 'keyset-count:' + hashlib.md5(f'{sql}{params}'.encode('utf-8')).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    def paginate_queryset(self, queryset, request):
+        self.request = request
+        self.cursor = request.query_params.get(self.cursor_query_param) or None
+
+        if request.query_params.get(self.count_query_param) in ('1', 'true', 'True'):
+            self.count = self.get_count(queryset.order_by())
+
+        reverse = False
+        if self.cursor:
+            reverse, created_at, pk = self.decode_cursor(self.cursor, queryset.model)
+            if reverse:
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+                ).order_by('created_at', 'id')
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+                ).order_by('-created_at', '-id')
+        else:
+            queryset = queryset.order_by('-created_at', '-id')
+
+        # Fetch one extra row to know whether there is another page
+        records = list(queryset[:self.page_size + 1])
+        has_more = len(records) > self.page_size
+        records = records[:self.page_size]
+        if reverse:
+            records.reverse()
+
+        self.next_cursor = None
+        self.previous_cursor = None
+        if records:
+            if has_more or reverse:
+                self.next_cursor = self.encode_cursor(records[-1])
+            if (has_more and reverse) or (self.cursor and not reverse):
+                self.previous_cursor = self.encode_cursor(records[0], reverse=True)
+        self.has_records = bool(records) or bool(self.count)
+        return records
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data, is_filter=False):
+        return Response({
+            'metadata': {
+                'count': self.count,
+                'is_filter': is_filter,
+                'has_records': self.has_records,
+                'page_size': self.page_size,
+                'cursor': self.cursor,
+                'next': self.get_link(self.next_cursor),
+                'previous': self.get_link(self.previous_cursor),
+            },
+            'results': data
+        })
+
+
+class KeysetPaginator:
+
+    def __init__(self, records, request, serialize_page=None):
+        """
+        Paginate a queryset with a ``(created_at, id)`` cursor.
+        :param records: The queryset to paginate, its model needs ``created_at``
+        :param request: The request object for pagination context
+        :param serialize_page: Optional callable that serializes the records of the current page
+        """
+        self.paginator = KeysetPagination()
+        self.records = records
+        self.request = request
+        self.serialize_page = serialize_page
+
+    def paginate(self, no_of_record: int):
+        self.paginator.page_size = clamp_page_size(no_of_record, self.paginator.max_page_size)
+        result_page = self.paginator.paginate_queryset(self.records, self.request)
+        if self.serialize_page is not None:
+            result_page = self.serialize_page(result_page)
+        return self.paginator.get_paginated_response(result_page)
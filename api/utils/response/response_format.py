@@ -1,7 +1,8 @@
 from rest_framework.response import Response
 from rest_framework import status
 from .code import status_code
-from .pagination import Paginator
+from django.db.models import QuerySet
+from .pagination import KeysetPaginator, Paginator
 
 
 class DataResponse:
@@ -55,6 +56,14 @@ def internal_server_error_response(message='Internal Server Error', status_code=
 
 
 
-def paginate_success_response(request, data=[],page_size=10):
-    paginator = Paginator(data,request)
+def paginate_success_response(request, data=[],page_size=10, serialize_page=None):
+    # Clients can opt into cursor pagination on any queryset listing with ?pagination=cursor
+    if isinstance(data, QuerySet) and request.GET.get('pagination') == 'cursor':
+        return cursor_paginate_success_response(request, data, page_size, serialize_page=serialize_page)
+    paginator = Paginator(data,request, serialize_page=serialize_page)
+    return paginator.paginate(page_size)
+
+
+def cursor_paginate_success_response(request, queryset, page_size=10, serialize_page=None):
+    paginator = KeysetPaginator(queryset, request, serialize_page=serialize_page)
     return paginator.paginate(page_size)
\ No newline at end of file
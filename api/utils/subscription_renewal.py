@@ -0,0 +1,216 @@
+import uuid
+from datetime import date
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from account.models import User
+from api.utils.member_import import MemberCSVImporter
+from subscription.models import MembershipSubscription, SubscriptionPayment
+from subscription.serializers import BulkSubscriptionMemberSerializer
+from transaction.models import RevenueRollup
+
+
+class SubscriptionRenewal:
+    """
+    Create subscriptions for many members at once, e.g. the yearly renewal.
+
+    Rows are ``(row_number, data)`` pairs where ``data`` names the member by
+    ``user`` (id) or ``email`` and can override ``start_date``,
+    ``amount_paid`` and ``payment_reference``, checked with
+    ``BulkSubscriptionMemberSerializer``. Each chunk of ``batch_size``
+    rows is resolved with one query per table, end dates are computed once
+    per distinct start date, and subscriptions and payments are written with
+    a ``bulk_create`` each inside one transaction. Paid renewals are added
+    to the revenue rollups with one update per day and payment method.
+
+    Every row gets an entry in ``results``, either ``created`` with the new
+    subscription or ``failed`` with the reason.
+    """
+    batch_size = 500
+
+    def __init__(self, plan, start_date=None, payment_method='cash', activate=True, batch_size=None):
+        self.plan = plan
+        self.start_date = start_date or date.today()
+        self.payment_method = payment_method
+        self.activate = activate
+        self.batch_size = batch_size or self.batch_size
+        self.created = 0
+        self.failed = 0
+        self.results = []
+        self.seen_users = set()
+        self.seen_references = set()
+        self.end_dates = {}
+
+    @staticmethod
+    def read_csv(file):
+        return MemberCSVImporter.read_rows(file)
+
+    def batches(self, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def run(self, rows):
+        for batch in self.batches(rows):
+            self.renew_batch(batch)
+        self.results.sort(key=lambda result: result['row'])
+        return self
+
+    def add_result(self, row_num, member, subscription=None, error=None):
+        if error:
+            self.failed += 1
+            self.results.append({'row': row_num, 'member': member, 'status': 'failed', 'errors': error})
+        else:
+            self.created += 1
+            self.results.append({
+                'row': row_num,
+                'member': member,
+                'status': 'created',
+                'subscription': str(subscription.id),
+                'end_date': subscription.end_date.isoformat(),
+            })
+
+    def get_end_date(self, start_date):
+        # Every row of a renewal usually shares its start date, so this is computed once
+        if start_date not in self.end_dates:
+            self.end_dates[start_date] = MembershipSubscription.calculate_may_31st_expiration(start_date)
+        return self.end_dates[start_date]
+
+    @staticmethod
+    def get_member_key(data):
+        if data.get('user'):
+            return 'id', str(data['user'])
+        return 'email', User.objects.normalize_email(data['email'])
+
+    def clean_row(self, data):
+        """Validate a row with BulkSubscriptionMemberSerializer and fill in the defaults"""
+        serializer = BulkSubscriptionMemberSerializer(data=data)
+        if not serializer.is_valid():
+            field, errors = next(iter(serializer.errors.items()))
+            message = errors[0] if isinstance(errors, list) else errors
+            raise ValidationError(message if field == 'non_field_errors' else f'{field}: {message}')
+        data = serializer.validated_data
+
+        amount_paid = data.get('amount_paid')
+        if amount_paid is None:
+            amount_paid = self.plan.price
+        payment_reference = data.get('payment_reference', '').strip()
+        if payment_reference and payment_reference in self.seen_references:
+            raise ValidationError(f'Duplicate payment reference: {payment_reference}')
+        return self.get_member_key(data), data.get('start_date') or self.start_date, amount_paid, payment_reference
+
+    def validate_batch(self, rows):
+        """Return ``(row_number, member, user_id, start_date, end_date, amount_paid, reference)`` for valid rows"""
+        members = []
+        for row_num, data in rows:
+            member = data.get('user') or data.get('email')
+            try:
+                key, start_date, amount_paid, payment_reference = self.clean_row(data)
+            except ValidationError as e:
+                self.add_result(row_num, member, error=e.messages[0])
+                continue
+            if key in self.seen_users:
+                self.add_result(row_num, member, error=f'Duplicate member in file: {key[1]}')
+                continue
+            self.seen_users.add(key)
+            if payment_reference:
+                self.seen_references.add(payment_reference)
+            members.append((row_num, member, key, start_date, amount_paid, payment_reference))
+        if not members:
+            return []
+
+        # One query each for the users, their existing subscriptions and the payment references
+        ids = [key[1] for _, _, key, *_ in members if key[0] == 'id']
+        emails = [key[1] for _, _, key, *_ in members if key[0] == 'email']
+        users = {}
+        for user_id, email in User.objects.filter(Q(id__in=ids) | Q(email__in=emails)).values_list('id', 'email'):
+            users[('id', str(user_id))] = user_id
+            users[('email', email)] = user_id
+
+        end_dates = {self.get_end_date(member[3]) for member in members}
+        subscribed = set(
+            MembershipSubscription.objects.filter(
+                user_id__in=set(users.values()),
+                status__in=['active', 'pending'],
+                end_date__in=end_dates,
+            ).values_list('user_id', 'end_date')
+        )
+        taken_references = set(
+            SubscriptionPayment.objects.filter(
+                payment_reference__in=[member[5] for member in members if member[5]]
+            ).values_list('payment_reference', flat=True)
+        )
+
+        valid_members = []
+        for row_num, member, key, start_date, amount_paid, payment_reference in members:
+            user_id = users.get(key)
+            end_date = self.get_end_date(start_date)
+            if user_id is None:
+                self.add_result(row_num, member, error=f'User not found: {key[1]}')
+            elif (user_id, end_date) in subscribed:
+                self.add_result(row_num, member, error=f'Already subscribed until {end_date.isoformat()}')
+            elif payment_reference in taken_references:
+                self.add_result(row_num, member, error=f'Payment reference already used: {payment_reference}')
+            else:
+                valid_members.append((row_num, member, user_id, start_date, end_date, amount_paid, payment_reference))
+        return valid_members
+
+    def renew_batch(self, rows):
+        members = self.validate_batch(rows)
+        if not members:
+            return 0
+
+        now = timezone.now()
+        today = date.today()
+        status = 'active' if self.activate else 'pending'
+        subscriptions = []
+        payments = []
+        current = []
+        for row_num, member, user_id, start_date, end_date, amount_paid, payment_reference in members:
+            payment_reference = payment_reference or f'RENEW-{uuid.uuid4().hex[:16].upper()}'
+            # bulk_create skips save(), so the end date and status are set here
+            subscription = MembershipSubscription(
+                user_id=user_id,
+                plan=self.plan,
+                start_date=start_date,
+                end_date=end_date,
+                amount_paid=amount_paid,
+                payment_method=self.payment_method,
+                payment_reference=payment_reference,
+                status=status,
+                activated_at=now if self.activate else None,
+            )
+            subscriptions.append(subscription)
+            payments.append(SubscriptionPayment(
+                subscription=subscription,
+                amount=amount_paid,
+                payment_method=self.payment_method,
+                payment_reference=payment_reference,
+                status='completed' if self.activate else 'pending',
+                paid_at=now if self.activate else None,
+            ))
+            if self.activate and start_date <= today <= end_date:
+                current.append(User(pk=user_id, current_subscription=subscription))
+
+        try:
+            with transaction.atomic():
+                MembershipSubscription.objects.bulk_create(subscriptions)
+                SubscriptionPayment.objects.bulk_create(payments)
+                User.objects.bulk_update(current, ['current_subscription'])
+                if self.activate:
+                    RevenueRollup.add_many(payment.get_revenue_key(self.plan.id) for payment in payments)
+        except DatabaseError:
+            for row_num, member, *_ in members:
+                self.add_result(row_num, member, error='Could not create the subscription, no rows in this batch were saved')
+            return 0
+
+        for (row_num, member, *_), subscription in zip(members, subscriptions):
+            self.add_result(row_num, member, subscription=subscription)
+        return len(subscriptions)
@@ -0,0 +1,107 @@
+import logging
+import traceback
+from datetime import timedelta
+from django.db import transaction as db_transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from api.utils.payment.paystack import Paystack
+from transaction.models import WebhookEvent
+
+
+class ClaimLost(Exception):
+    """The event was requeued and claimed again while this worker was applying it"""
+
+
+class WebhookProcessor:
+    """
+    Applies stored WebhookEvent rows.
+
+    Like JobRunner, events are claimed with a conditional UPDATE so several
+    workers can share the queue. An event that raises goes back to pending
+    with ``next_attempt_at`` pushed back, ``retry_delay`` doubled on every
+    attempt, until it has been tried ``WebhookEvent.MAX_ATTEMPTS`` times.
+    An event left processing for ``stale_after`` lost its worker and is put
+    back in the queue, or failed once it has used up its attempts.
+
+    The handler's writes and the event's status change commit together, and
+    only while the event still carries this worker's ``claimed_at``. A worker
+    that crashes, or was too slow and had its event requeued, leaves nothing
+    applied, so an event is applied at most once.
+    """
+    handlers = {
+        'paystack': Paystack.process_webhook,
+    }
+    retry_delay = timedelta(seconds=30)
+    stale_after = timedelta(minutes=5)
+
+    @staticmethod
+    def record(provider, event_key, event_type, payload):
+        """Store an event with a single INSERT, a repeated delivery is dropped by the unique key"""
+        WebhookEvent.objects.bulk_create(
+            [WebhookEvent(provider=provider, event_key=event_key, event_type=event_type or '', payload=payload)],
+            ignore_conflicts=True,
+        )
+
+    @classmethod
+    def get_next_attempt(cls, attempts):
+        return timezone.now() + cls.retry_delay * 2 ** max(attempts - 1, 0)
+
+    @classmethod
+    def requeue_stale(cls):
+        """Requeue or fail events whose worker stopped while processing them, returns ``(requeued, failed)``"""
+        now = timezone.now()
+        stale = WebhookEvent.objects.filter(
+            Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - cls.stale_after), status='processing'
+        )
+        failed = stale.filter(attempts__gte=WebhookEvent.MAX_ATTEMPTS).update(
+            status='failed', result='The worker processing this event stopped responding'
+        )
+        # It has already waited stale_after, so it is due straight away
+        requeued = stale.update(status='pending', next_attempt_at=now)
+        return requeued, failed
+
+    @classmethod
+    def claim_batch(cls, size):
+        """Mark up to ``size`` due events as processing and return the ones this worker got"""
+        cls.requeue_stale()
+        now = timezone.now()
+        due = WebhookEvent.objects.filter(
+            Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now), status='pending'
+        )
+        ids = list(due.order_by('created_at').values_list('id', flat=True)[:size])
+        claimed = []
+        for pk in ids:
+            if WebhookEvent.objects.filter(id=pk, status='pending').update(
+                status='processing', attempts=F('attempts') + 1, claimed_at=now
+            ):
+                claimed.append(pk)
+        return list(WebhookEvent.objects.filter(id__in=claimed).order_by('created_at'))
+
+    @staticmethod
+    def finish(event: WebhookEvent, **fields):
+        """Save the outcome if the event is still claimed by this worker, returns False otherwise"""
+        if not WebhookEvent.objects.filter(id=event.id, status='processing', claimed_at=event.claimed_at).update(**fields):
+            return False
+        for name, value in fields.items():
+            setattr(event, name, value)
+        return True
+
+    @classmethod
+    def process(cls, event: WebhookEvent):
+        try:
+            with db_transaction.atomic():
+                result = cls.handlers[event.provider](event.payload)
+                if not cls.finish(event, status='processed', result=result, processed_at=timezone.now()):
+                    raise ClaimLost
+        except ClaimLost:
+            logging.warning(f'Webhook event {event.event_key} was claimed again, its changes were rolled back')
+            event.result = 'Claimed by another worker'
+        except Exception as e:
+            logging.error(e)
+            logging.error(traceback.format_exc())
+            if event.attempts >= WebhookEvent.MAX_ATTEMPTS:
+                cls.finish(event, status='failed', result=str(e))
+            else:
+                cls.finish(event, status='pending', result=str(e), next_attempt_at=cls.get_next_attempt(event.attempts))
+        return event
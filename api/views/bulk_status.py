@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from account.models import User
 from api.serializers.bulk_status import BulkStatusUpdateSerializer
+from api.utils.overview import MemberOverview
 
 class BulkStatusUpdateView(APIView):
     permission_classes = [IsAdminUser]
@@ -14,6 +15,8 @@ class BulkStatusUpdateView(APIView):
             user_ids = serializer.validated_data['user_ids']
             is_active = serializer.validated_data['is_active']
             updated = User.objects.filter(id__in=user_ids).update(is_active=is_active)
+            # update() skips the post_save signal, so drop the dashboard counts here
+            MemberOverview.invalidate()
             return Response({
                 'success': True,
                 'updated_count': updated,
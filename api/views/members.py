@@ -1,16 +1,16 @@
-import csv
-import io
 from datetime import date
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.db import transaction,IntegrityError
 from django.utils import timezone
-from django.db.models import Count
-from django.db.models.functions import TruncMonth
 from account.models import Category, Church, IDCard, User, UserRequest, YouthGroup, RequestStatus
 from account.serializers import IDCardSerializer, RegisterSerializer
 from account.serializers import UserSerializer
+from api.models import BackgroundJob
+from api.serializers.job import BackgroundJobSerializer
 from api.serializers.members import UserRequestListSerializer, UserRequestSerializer
+from api.utils.card_verification import CardVerification
+from api.utils.overview import MemberOverview
 from api.utils.response.response_format import success_response, paginate_success_response, bad_request_response,internal_server_error_response
 
 from rest_framework import generics, status
@@ -25,68 +25,8 @@ class AdminGetMemberOverview(generics.GenericAPIView):
     def get(self, request):
         overview = request.GET.get('overview')
 
-        # Use one base queryset for all cases
-        queryset = User.objects.filter(is_admin=False)
-        response = {}
-
-        if overview == 'gender':
-            # Get gender breakdown counts from linked UserRequest
-            gender_counts = queryset.filter(user_request__isnull=False).values('user_request__gender').annotate(count=Count('id'))
-            
-            # Create a dictionary for easy lookup
-            gender_count_dict = {item['user_request__gender']: item['count'] for item in gender_counts}
-            
-            response = [
-                {"name": 'Male', 'value': gender_count_dict.get('Male', 0)},
-                {"name": 'Female', 'value': gender_count_dict.get('Female', 0)},
-                {'name': 'Other', 'value': gender_count_dict.get('Other', 0)}
-            ]
-
-        elif overview == 'month':
-            from datetime import datetime
-            import calendar
-            from django.db.models import Q
-
-            # Get current year
-            current_year = datetime.now().year
-            
-            # Get monthly counts for the current year
-            monthly_counts = queryset.filter(
-                Q(created_at__year=current_year) & 
-                Q(created_at__isnull=False)
-            ).annotate(
-                month=TruncMonth('created_at')
-            ).values('month').annotate(
-                members=Count('id')
-            ).order_by('month')
-            
-            # Convert to dictionary for lookup
-            month_data = {
-                entry['month'].month: entry['members'] 
-                for entry in monthly_counts
-            }
-            
-            # Create a list with all months, using 0 for months with no signups
-            response = [
-                {
-                    'month': calendar.month_abbr[month], 
-                    'members': month_data.get(month, 0)
-                }
-                for month in range(1, 13)
-            ]
-
-        else:
-            # Default: Total, active, and inactive counts
-            total = queryset.count()
-            total_active = queryset.filter(is_active=True).count()
-            total_inactive = queryset.filter(is_active=False).count()
-
-            response = {
-                'total': total,
-                'active': total_active,
-                'inactive': total_inactive,
-                'new': total  # For now, 'new' will return total count as a placeholder
-            }
+        # 'gender', 'month' or the default total/active/inactive/new counts
+        response = MemberOverview.get(overview)
 
         return success_response(
             data=response
@@ -115,88 +55,34 @@ class AdminMembersBulkUploadView(generics.GenericAPIView):
                 message='Please upload a CSV file'
             )
         
-        # Process the CSV file
-        try:
-            # Decode and process CSV
-            csv_data = file.read().decode('utf-8')
-            csv_file = io.StringIO(csv_data)
-            reader = csv.DictReader(csv_file)
-            
-            # Track results
-            processed_members = []
-            errors = []
-            first_error = None
-            
-            # Process all rows within a single transaction
-            with transaction.atomic():
-                for row_num, row in enumerate(reader, start=2):  # Start from 2 to account for header row
-                    try:
-                        # Map CSV fields to expected model fields (only essential fields for User)
-                        member_data = {
-                            'first_name': row.get('firstName') or row.get('first_name') or '',
-                            'last_name': row.get('lastName') or row.get('last_name') or '',
-                            'email': row.get('email') or '',
-                        }
-
-                        # Create user with only essential authentication fields
-                        user = User.objects.create(
-                            first_name=member_data.get('first_name'),
-                            last_name=member_data.get('last_name'),
-                            email=member_data.get('email') or '',
-                        )
-
-                        user.set_password('YMCA123456789')
-                        user.save()
+        # The import runs in the background (see the run_jobs command), poll the job for progress
+        job = BackgroundJob.objects.create(
+            job_type='member_import',
+            file=file,
+            created_by=request.user,
+        )
 
-                        print('First User Created...... : ', user.email)
+        return success_response(
+            data=BackgroundJobSerializer(job).data,
+            message='Upload received, members are being imported',
+            status_code=status.HTTP_202_ACCEPTED,
+        )
 
-                        user_card, created = IDCard.objects.get_or_create(user=user)
-                        if created and member_data.get('id_number'):
-                            user_card.id_number = member_data.get('id_number')
-                            user_card.save()
 
-                        # Add successful member to the list
-                        processed_members.append(user)
 
-                    except IntegrityError as e:    
-                        print(f"Error creating user at row {row_num}")
-                        print(e)
-                        error_message =  f"Bulk upload failed, error creating user at row {row_num}"
-                        raise Exception(error_message)
-                    
-                    except Exception as e:
-                        error_info = {
-                            'row': row_num,
-                            'data': row,
-                            'errors': str(e)
-                        }
-                        errors.append(error_info)
-                        
-                        # Store the first error encountered
-                        if first_error is None:
-                            first_error = error_info
-                
-                # Check if there were any errors
-                if errors and not processed_members:
-                    # If all records failed, raise an exception to roll back the entire transaction
-                    if first_error:
-                        error_message = f"Error at row {first_error['row']}: {first_error['errors']}"
-                        raise Exception(error_message)
-                    else:
-                        raise Exception('All records failed to process')
-            
-            # Return success response with processed members
-            return success_response(
-                message=f'Successfully uploaded {len(processed_members)} members' + 
-                        (f' with {len(errors)} errors' if errors else ''),
-            )
-            
-        except Exception as e:
-            print(e)
-            # Transaction will be automatically rolled back if we reach here
-            return bad_request_response(
-                message=f'Error processing CSV file: {str(e)}'
-            )
+class AdminJobDetailView(generics.RetrieveAPIView):
+    """
+    Progress and per-row errors of a background job
+    """
+    permission_classes = [IsAdminUser]
+    queryset = BackgroundJob.objects.all()
+    serializer_class = BackgroundJobSerializer
+
+    def get(self, request, *args, **kwargs):
+        job = self.get_object()
+        return success_response(
+            data=self.serializer_class(job).data
+        )
 
 
 
@@ -221,9 +107,13 @@ class AdminAddMembersView(generics.GenericAPIView):
         return success_response(data={})
 
     def get(self, request):
-        members = self.get_queryset().order_by('-created_at')
-        serializer = UserSerializer(members, many=True, context={'request': request})
-        return paginate_success_response(request, serializer.data, int(request.GET.get('page_size', 100)))
+        members = UserSerializer.setup_eager_loading(self.get_queryset().order_by('-created_at'))
+        return paginate_success_response(
+            request,
+            members,
+            int(request.GET.get('page_size', 100)),
+            serialize_page=lambda page: UserSerializer(page, many=True, context={'request': request}).data,
+        )
     
 
 
@@ -405,8 +295,12 @@ class AdminUserRequestListView(generics.ListAPIView):
 
     def get(self, request, *args, **kwargs):
         members = self.get_queryset()
-        serializer = self.serializer_class(members, many=True, context={'request': request})
-        return paginate_success_response(request, serializer.data, int(request.GET.get('page_size', 100)))
+        return paginate_success_response(
+            request,
+            members,
+            int(request.GET.get('page_size', 100)),
+            serialize_page=lambda page: self.serializer_class(page, many=True, context={'request': request}).data,
+        )
 
 
 
@@ -550,38 +444,7 @@ class VerifyCardIdNumberView(generics.GenericAPIView):
     permission_classes = []
 
     def get(self, request, id_number):
-        card = IDCard.objects.filter(id_number=id_number).first()
-
-        # If card is not found
-        if not card:
-            return success_response(
-                data={
-                    'valid': False,
-                    'error': 'Card not found or invalid verification ID',
-                    'cardId': id_number
-                }
-            )
-
-        # Check and update expiration status
-        if card.expired_at and card.expired_at < date.today():
-            if not card.expired:
-                card.expired = True
-                card.save(update_fields=['expired'])
-        else:
-            if card.expired:
-                card.expired = False
-                card.save(update_fields=['expired'])
-
-        # Build response
-        response_data = IDCardSerializer(card).data
-        response_data['first_name'] = card.user.first_name
-        response_data['last_name'] = card.user.last_name
-
+        # Read-only and cached, scans at events come in bursts
         return success_response(
-            data=dict(
-                valid=True,
-                data=response_data,
-                verifiedAt=card.updated_at,
-                expired=card.expired
-            )
+            data=CardVerification.get(id_number)
         )
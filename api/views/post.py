@@ -11,8 +11,9 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q
 
 from api.models import Post, UpdateAttachment
-from api.serializers.post import AttachmentCreateSerializer, PostCreateUpdateSerializer, PostListSerializer, UpdateAttachmentSerializer
-from api.utils.response.response_format import success_response, bad_request_response
+from api.serializers.post import AttachmentCreateSerializer, PostCreateUpdateSerializer, PostFeedSerializer, PostListSerializer, UpdateAttachmentSerializer
+from api.utils.response.pagination import parse_page_size
+from api.utils.response.response_format import success_response, bad_request_response, cursor_paginate_success_response
 
 import base64, uuid
 from django.core.files.base import ContentFile
@@ -41,6 +42,7 @@ class PostViewSet(viewsets.ModelViewSet):
     # ordering_fields = ['created_at', 'updated_at', 'title']
     serializer_class = PostListSerializer
     ordering = ['-created_at']  
+    default_page_size = 20
 
 
     # def create(self, request, *args, **kwargs):
@@ -118,22 +120,28 @@ class PostViewSet(viewsets.ModelViewSet):
     
 
     def list(self, request, *args, **kwargs):
-        # response =  super().list(request, *args, **kwargs)
-        query_set = self.get_queryset().order_by('-created_at')
+        """Feed of posts, newest first with a ``(created_at, id)`` cursor and the compact shape"""
+        query_set = self.get_queryset()
         category = request.GET.get('category')
         if category:
             if category != 'All':
                 query_set = query_set.filter(category=category)
 
-        serializer = self.serializer_class(query_set,many=True,context={'request': request})
-
-        return success_response(data=serializer.data, message='Posts retrieved successfully')
+        page = cursor_paginate_success_response(
+            request,
+            PostFeedSerializer.setup_eager_loading(query_set),
+            parse_page_size(request.GET.get('page_size'), self.default_page_size),
+            serialize_page=lambda records: PostFeedSerializer(records, many=True, context={'request': request}).data,
+        )
+        return success_response(data=page.data, message='Posts retrieved successfully')
 
 
     def get_serializer_class(self):
         """Return appropriate serializer based on action"""
         if self.action in ['create', 'update', 'partial_update']:
             return PostCreateUpdateSerializer
+        if self.action == 'list':
+            return PostFeedSerializer
         return PostListSerializer
 
     def get_queryset(self):
@@ -1,7 +1,17 @@
 
+import json
+import uuid
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import status, generics
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
@@ -9,8 +19,12 @@ from django.contrib.auth import authenticate
 
 from account.models import IDCard, User
 from api.serializers.donation import DonationInitiateSerializer
+from api.serializers.transaction import RevenueQuerySerializer, TransactionFilterSerializer, TransactionSerializer
 from api.utils.payment.paystack import Paystack
-from api.utils.response.response_format import success_response, bad_request_response
+from api.utils.revenue import RevenueReport
+from api.utils.webhooks import WebhookProcessor
+from api.utils.response.response_format import success_response, bad_request_response, cursor_paginate_success_response
+from transaction.models import Transaction
 import datetime
 
 class StartMembershipDemoView(generics.GenericAPIView):
@@ -101,8 +115,164 @@ class VerifyPaymentView(generics.GenericAPIView):
 
 
 
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncPaymentView(View):
+    """
+    Base for async payment views, served without DRF since its views are sync only.
+
+    Under ASGI (backend/asgi.py) the worker keeps serving other requests
+    while the call to Paystack is in flight. Responses have the same body as
+    the DRF views. Subclasses set ``verify_func``, the coroutine that checks
+    a transaction with Paystack.
+    """
+    authentication_required = False
+
+    @staticmethod
+    def get_data(request):
+        if request.content_type == 'application/json':
+            try:
+                return json.loads(request.body or b'{}')
+            except ValueError:
+                return {}
+        return request.POST
+
+    @staticmethod
+    def to_json_response(response):
+        return JsonResponse(response.data, status=response.status_code, encoder=JSONEncoder)
+
+    async def authenticate(self, request):
+        """Return the JWT user or a 401 response"""
+        try:
+            result = await sync_to_async(JWTAuthentication().authenticate)(request)
+        except APIException as e:
+            return None, JsonResponse({'detail': str(e.detail)}, status=401)
+        if result is None:
+            return None, JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+        return result[0], None
+
+    async def post(self, request, *args, **kwargs):
+        if self.authentication_required:
+            request.user, error = await self.authenticate(request)
+            if error:
+                return error
+
+        transaction_id = self.get_data(request).get("trxn")
+        if not transaction_id:
+            return self.to_json_response(bad_request_response(
+                message='Transaction ID is required',
+            ))
+        return self.to_json_response(await self.verify_func(transaction_id))
+
+
+class AsyncVerifyPaymentView(AsyncPaymentView):
+    """Async VerifyPaymentView"""
+    authentication_required = True
+    verify_func = staticmethod(Paystack.avalidate_payment)
+
+
+class AsyncVerifyDonationPamentView(AsyncPaymentView):
+    """Async VerifyDonationPamentView"""
+    verify_func = staticmethod(Paystack.avalidate_payment_donation)
+
+
+
+
+class PaystackWebhookView(generics.GenericAPIView):
+    """
+    Receive Paystack webhooks.
+
+    The event is only stored, with a single INSERT that repeated deliveries
+    turn into a no-op, and acknowledged straight away. The process_webhooks
+    command applies it to the transaction afterwards.
+    """
+    authentication_classes = []
+    permission_classes = []
+
+    def post(self, request, *args, **kwargs):
+        # The signature covers the raw body, read it before DRF parses it
+        body = request.body
+        if not Paystack.verify_webhook_signature(body, request.headers.get('x-paystack-signature')):
+            return bad_request_response(message='Invalid signature', status_code=401)
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return bad_request_response(message='Invalid payload')
+
+        WebhookProcessor.record('paystack', Paystack.get_webhook_event_key(payload), payload.get('event'), payload)
+        return success_response(message='Event received')
+
+
 class TotalMembersCountView(generics.GenericAPIView):
     permission_classes = []
 
     def get(self, request, *args, **kwargs):
-        return success_response(data={"count":User.objects.count()})
\ No newline at end of file
+        return success_response(data={"count":User.objects.count()})
+
+
+
+class AdminTransactionListView(generics.ListAPIView):
+    """
+    Transactions for reconciliation, newest first with a ``(created_at, id)`` cursor.
+
+    Filters: ``status``, ``transaction_type``, ``user``, ``email``,
+    ``reference`` (transaction id or gateway reference) and a
+    ``start_date``/``end_date`` range on the creation date.
+    """
+    serializer_class = TransactionSerializer
+    permission_classes = [IsAdminUser]
+    default_page_size = 50
+
+    def get_queryset(self):
+        filters = TransactionFilterSerializer(data=self.request.GET)
+        filters.is_valid(raise_exception=True)
+        filters = filters.validated_data
+
+        queryset = Transaction.objects.all()
+        for field in ('status', 'transaction_type'):
+            if filters.get(field):
+                queryset = queryset.filter(**{field: filters[field]})
+        if filters.get('user'):
+            queryset = queryset.filter(user_id=filters['user'])
+        if filters.get('email'):
+            queryset = queryset.filter(user__email=User.objects.normalize_email(filters['email']))
+        if filters.get('reference'):
+            reference = filters['reference']
+            try:
+                queryset = queryset.filter(id=uuid.UUID(reference))
+            except ValueError:
+                queryset = queryset.filter(gateway_reference=reference)
+        # A created_at range instead of __date keeps the indexes usable
+        if filters.get('start_date'):
+            queryset = queryset.filter(created_at__gte=RevenueReport.start_of_day(filters['start_date']))
+        if filters.get('end_date'):
+            queryset = queryset.filter(
+                created_at__lt=RevenueReport.start_of_day(filters['end_date'] + datetime.timedelta(days=1))
+            )
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.serializer_class.setup_eager_loading(self.get_queryset())
+        page = cursor_paginate_success_response(
+            request,
+            queryset,
+            int(request.GET.get('page_size', self.default_page_size)),
+            serialize_page=lambda records: self.serializer_class(records, many=True).data,
+        )
+        return success_response(data=page.data)
+
+
+class AdminTransactionRevenueView(generics.GenericAPIView):
+    """
+    Paid totals per ``day`` or ``month`` (``?period=``), read from the revenue rollups.
+
+    Defaults to the last 30 days by day or the last 12 months by month,
+    ``start_date``, ``end_date`` and ``category`` (a transaction type,
+    ``SUBSCRIPTION`` or ``DONATION``) narrow it down.
+    """
+    serializer_class = RevenueQuerySerializer
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.GET)
+        serializer.is_valid(raise_exception=True)
+        return success_response(data=RevenueReport(**serializer.validated_data).build())
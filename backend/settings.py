@@ -86,6 +86,28 @@ DATABASES = {
 }
 
 
+# Cache
+# Shared by every web and worker process, so a signal or command that invalidates
+# an entry (member overview, ID card verification) is seen everywhere. Set
+# REDIS_URL to use Redis (needs the redis package), otherwise the cache table
+# created by the api migrations is used.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -174,4 +196,17 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 1000
 
 
-BASE_URL=''
\ No newline at end of file
+BASE_URL=''
+
+# Payment gateway HTTP client (api/utils/payment/client.py)
+# Per gateway overrides use the gateway name, e.g. PAYSTACK_TIMEOUT or PAYSTACK_BASE_URL for a stub server
+PAYSTACK_BASE_URL = os.environ.get('PAYSTACK_BASE_URL', 'https://api.paystack.co')
+PAYMENT_GATEWAY_TIMEOUT = (3.05, 15)  # (connect, read) seconds
+PAYMENT_GATEWAY_RETRIES = 2
+PAYMENT_GATEWAY_BACKOFF = 0.3
+PAYMENT_GATEWAY_POOL_SIZE = 10
+# Full gateway payloads are kept in transaction.GatewayEvent, zlib compressed unless this is off
+PAYMENT_GATEWAY_COMPRESS_EVENTS = True
+
+# Used for API calls and to check webhook signatures, webhooks are rejected while it is unset
+PAYSTACK_SECRET_KEY = os.environ.get('PAYSTACK_SECRET_KEY', '')
@@ -0,0 +1,34 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+
+from account.models import IDCard
+from subscription.models import MembershipSubscription
+
+
+class Command(BaseCommand):
+    help = (
+        'Expire every ID card and membership subscription past its expiry date. '
+        'Meant to run daily from cron or another scheduler.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count what would be expired',
+        )
+
+    def handle(self, *args, **options):
+        today = date.today()
+
+        if options['dry_run']:
+            cards = IDCard.objects.filter(expired=False, expired_at__lt=today).count()
+            subscriptions = MembershipSubscription.objects.filter(status='active', end_date__lt=today).count()
+            self.stdout.write(f'Would expire {cards} ID cards and {subscriptions} subscriptions')
+            return
+
+        # One UPDATE per table, no rows are loaded
+        cards = IDCard.expire_overdue(today)
+        subscriptions = MembershipSubscription.expire_overdue(today)
+
+        self.stdout.write(self.style.SUCCESS(f'Expired {cards} ID cards and {subscriptions} subscriptions'))
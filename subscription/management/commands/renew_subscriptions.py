@@ -0,0 +1,82 @@
+import time
+import uuid
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+
+from api.utils.subscription_renewal import SubscriptionRenewal
+from subscription.models import MembershipSubscription, SubscriptionPlan
+
+
+class Command(BaseCommand):
+    help = (
+        'Create or renew subscriptions for every member in a CSV file. '
+        'The file needs a user (id) or email column and can set start_date, amount_paid and payment_reference per row.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='Path to the CSV file of members')
+        parser.add_argument('--plan', required=True, help='Subscription plan id or name')
+        parser.add_argument(
+            '--start-date',
+            type=date.fromisoformat,
+            help='Start date (YYYY-MM-DD) for rows without one, defaults to today',
+        )
+        parser.add_argument(
+            '--payment-method',
+            default='cash',
+            choices=[choice for choice, _ in MembershipSubscription.PAYMENT_METHOD_CHOICES],
+        )
+        parser.add_argument(
+            '--pending',
+            action='store_true',
+            help='Create pending subscriptions and payments instead of activating them',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of rows written per transaction',
+        )
+
+    @staticmethod
+    def get_plan(value):
+        try:
+            return SubscriptionPlan.objects.get(id=uuid.UUID(value))
+        except (ValueError, SubscriptionPlan.DoesNotExist):
+            pass
+        plan = SubscriptionPlan.objects.filter(name=value).first()
+        if plan is None:
+            raise CommandError(f'Subscription plan not found: {value}')
+        return plan
+
+    def handle(self, *args, **options):
+        plan = self.get_plan(options['plan'])
+        renewal = SubscriptionRenewal(
+            plan,
+            start_date=options['start_date'],
+            payment_method=options['payment_method'],
+            activate=not options['pending'],
+            batch_size=options['batch_size'],
+        )
+
+        started = time.monotonic()
+        try:
+            with open(options['csv_file'], 'rb') as file:
+                renewal.run(renewal.read_csv(file))
+        except OSError as e:
+            raise CommandError(str(e))
+        elapsed = time.monotonic() - started
+
+        if options['verbosity'] >= 2:
+            for result in renewal.results:
+                if result['status'] == 'created':
+                    self.stdout.write(f"Row {result['row']}: {result['member']} until {result['end_date']}")
+        for result in renewal.results:
+            if result['status'] == 'failed':
+                self.stdout.write(self.style.ERROR(f"Row {result['row']}: {result['member']} - {result['errors']}"))
+
+        self.stdout.write(self.style.SUCCESS('\n--- Summary ---'))
+        self.stdout.write(self.style.SUCCESS(f'Created: {renewal.created}'))
+        if renewal.failed:
+            self.stdout.write(self.style.ERROR(f'Failed: {renewal.failed}'))
+        self.stdout.write(f'Elapsed: {elapsed:.2f}s')
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscription', '0002_membershipsubscription_subscription_status_end_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='membershipsubscription',
+            index=models.Index(fields=['user', 'status', 'end_date', 'start_date'], name='subscription_user_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membershipsubscription',
+            index=models.Index(fields=['user', '-created_at'], name='subscription_user_created_idx'),
+        ),
+    ]
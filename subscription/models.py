@@ -1,8 +1,10 @@
 import uuid
 from datetime import date, datetime
-from django.db import models
+from django.db import models, transaction as db_transaction
+from django.db.models import Case, OuterRef, Subquery, Value, When
 from django.utils import timezone
 from account.models import User
+from transaction.models import GatewayPayment, RevenueRollup
 
 
 class SubscriptionPlan(models.Model):
@@ -70,6 +72,13 @@ class MembershipSubscription(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Membership Subscription'
         verbose_name_plural = 'Membership Subscriptions'
+        indexes = [
+            # Used by MembershipSubscription.expire_overdue
+            models.Index(fields=['status', 'end_date'], name='subscription_status_end_idx'),
+            # Used by get_user_active_subscription and get_user_subscription_history
+            models.Index(fields=['user', 'status', 'end_date', 'start_date'], name='subscription_user_active_idx'),
+            models.Index(fields=['user', '-created_at'], name='subscription_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.plan.name} ({self.status})"
@@ -85,6 +94,8 @@ class MembershipSubscription(models.Model):
                 self.status = 'expired'
         
         super().save(*args, **kwargs)
+        # activate, cancel and status edits all go through here
+        self.refresh_current_subscription(self.user_id)
 
     @staticmethod
     def calculate_may_31st_expiration(start_date):
@@ -134,14 +145,93 @@ class MembershipSubscription(models.Model):
         return self.end_date and self.end_date < date.today()
 
     @classmethod
-    def get_user_active_subscription(cls, user):
-        """Get user's current active subscription"""
+    def expire_overdue(cls, today=None):
+        """Expire every active subscription past its end date in one UPDATE, returns the count"""
+        today = today or date.today()
+        expired = cls.objects.filter(status='active', end_date__lt=today).update(
+            status='expired',
+            updated_at=timezone.now(),
+        )
+        if expired:
+            User.objects.filter(current_subscription__status='expired').update(current_subscription=None)
+        return expired
+
+    @classmethod
+    def refresh_current_subscriptions(cls, user_ids):
+        """Set-based ``refresh_current_subscription`` for many users in one UPDATE"""
+        today = date.today()
+        current = cls.objects.filter(
+            user=OuterRef('pk'),
+            status='active',
+            start_date__lte=today,
+            end_date__gte=today
+        ).order_by('-created_at').values('id')[:1]
+        User.objects.filter(pk__in=user_ids).update(current_subscription=Subquery(current))
+
+    @classmethod
+    def bulk_activate(cls, ids):
+        """
+        Activate every subscription in ``ids`` with a single UPDATE.
+
+        Subscriptions already past their end date become expired, as ``save()``
+        would do. Returns ``{id: status}`` for the subscriptions that exist.
+        """
+        today = date.today()
+        with db_transaction.atomic():
+            # Locked so the statuses returned are the ones the CASE writes
+            subscriptions = list(
+                cls.objects.select_for_update().filter(id__in=ids).values_list('id', 'user_id', 'end_date')
+            )
+            cls.objects.filter(id__in=[pk for pk, _, _ in subscriptions]).update(
+                status=Case(When(end_date__lt=today, then=Value('expired')), default=Value('active')),
+                activated_at=timezone.now(),
+                updated_at=timezone.now(),
+            )
+            cls.refresh_current_subscriptions({user_id for _, user_id, _ in subscriptions})
+        return {
+            pk: 'expired' if end_date and end_date < today else 'active'
+            for pk, _, end_date in subscriptions
+        }
+
+    @classmethod
+    def bulk_cancel(cls, ids):
+        """Cancel every subscription in ``ids`` with a single UPDATE, returns ``{id: status}``"""
+        with db_transaction.atomic():
+            subscriptions = list(cls.objects.select_for_update().filter(id__in=ids).values_list('id', 'user_id'))
+            cls.objects.filter(id__in=[pk for pk, _ in subscriptions]).update(
+                status='cancelled',
+                cancelled_at=timezone.now(),
+                updated_at=timezone.now(),
+            )
+            cls.refresh_current_subscriptions({user_id for _, user_id in subscriptions})
+        return {pk: 'cancelled' for pk, _ in subscriptions}
+
+    @classmethod
+    def get_active_queryset(cls, user_id, today=None):
+        today = today or date.today()
         return cls.objects.filter(
-            user=user,
+            user_id=user_id,
             status='active',
-            start_date__lte=date.today(),
-            end_date__gte=date.today()
-        ).first()
+            start_date__lte=today,
+            end_date__gte=today
+        )
+
+    @classmethod
+    def refresh_current_subscription(cls, user_id):
+        """Point ``User.current_subscription`` at the user's active subscription, or clear it"""
+        current = cls.get_active_queryset(user_id).values_list('id', flat=True).first()
+        User.objects.filter(pk=user_id).update(current_subscription=current)
+        return current
+
+    @classmethod
+    def get_user_active_subscription(cls, user):
+        """Get user's current active subscription"""
+        if user.current_subscription_id:
+            # The pointer can be stale until the expiry sweeper runs, so check it's still active
+            subscription = cls.objects.filter(pk=user.current_subscription_id).first()
+            if subscription and subscription.is_active():
+                return subscription
+        return cls.get_active_queryset(user.pk).first()
 
     @classmethod
     def get_user_subscription_history(cls, user):
@@ -149,7 +239,7 @@ class MembershipSubscription(models.Model):
         return cls.objects.filter(user=user).order_by('-created_at')
 
 
-class SubscriptionPayment(models.Model):
+class SubscriptionPayment(GatewayPayment):
     """Model to track subscription payments"""
     
     PAYMENT_STATUS_CHOICES = [
@@ -165,14 +255,12 @@ class SubscriptionPayment(models.Model):
     payment_method = models.CharField(max_length=20, choices=MembershipSubscription.PAYMENT_METHOD_CHOICES)
     payment_reference = models.CharField(max_length=100, unique=True)
     status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='pending')
-    
-    # Payment gateway response
-    gateway_response = models.JSONField(null=True, blank=True)
-    
+
+    # Gateway reference, channel, fees, paid_at and the raw payload come from GatewayPayment
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    paid_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-created_at']
@@ -180,11 +268,25 @@ class SubscriptionPayment(models.Model):
     def __str__(self):
         return f"Payment {self.payment_reference} - {self.amount} ({self.status})"
 
+    def get_revenue_key(self, plan_id=None):
+        """``RevenueRollup.add_many`` entry of this payment"""
+        return (
+            RevenueRollup.get_day(self.paid_at),
+            RevenueRollup.SUBSCRIPTION,
+            str(plan_id or self.subscription.plan_id),
+            self.payment_method,
+            self.amount,
+        )
+
     def mark_as_paid(self):
         """Mark payment as completed"""
+        was_paid = self.status == 'completed'
         self.status = 'completed'
         self.paid_at = timezone.now()
-        self.save()
+        with db_transaction.atomic():
+            self.save()
+            if not was_paid:
+                RevenueRollup.add_many([self.get_revenue_key()])
         
         # Activate the associated subscription
         if self.subscription.status == 'pending':
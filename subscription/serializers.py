@@ -51,6 +51,11 @@ class MembershipSubscriptionSerializer(serializers.ModelSerializer):
             'updated_at', 'activated_at', 'cancelled_at', 'payments'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load the plan, user (with their request, used by get_full_name) and payments up front."""
+        return queryset.select_related('plan', 'user__user_request').prefetch_related('payments')
+
     def get_is_currently_active(self, obj):
         """Check if subscription is currently active"""
         return obj.is_active()
@@ -75,6 +80,11 @@ class MembershipSubscriptionListSerializer(serializers.ModelSerializer):
             'created_at'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load the plan in the same query as the subscriptions."""
+        return queryset.select_related('plan')
+
     def get_is_currently_active(self, obj):
         """Check if subscription is currently active"""
         return obj.is_active()
@@ -95,4 +105,46 @@ class CreateSubscriptionSerializer(serializers.ModelSerializer):
         subscription = MembershipSubscription(**validated_data)
         # The save method will automatically calculate end_date
         subscription.save()
-        return subscription
\ No newline at end of file
+        return subscription
+
+class BulkSubscriptionMemberSerializer(serializers.Serializer):
+    """One member row of a bulk renewal, from the ``members`` list or a CSV line"""
+
+    user = serializers.UUIDField(required=False)
+    email = serializers.EmailField(required=False)
+    start_date = serializers.DateField(required=False)
+    amount_paid = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    payment_reference = serializers.CharField(max_length=100, required=False)
+
+    def to_internal_value(self, data):
+        # CSV cells and JSON nulls for optional values mean "not given"
+        if isinstance(data, dict):
+            data = {key: value for key, value in data.items() if value not in ('', None)}
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        if not attrs.get('user') and not attrs.get('email'):
+            raise serializers.ValidationError('A user id or email address is required')
+        return attrs
+
+
+class BulkSubscriptionSerializer(serializers.Serializer):
+    """Input for creating or renewing subscriptions for many members at once"""
+
+    plan = serializers.PrimaryKeyRelatedField(queryset=SubscriptionPlan.objects.filter(is_active=True))
+    start_date = serializers.DateField(required=False)
+    payment_method = serializers.ChoiceField(choices=MembershipSubscription.PAYMENT_METHOD_CHOICES, default='cash')
+    activate = serializers.BooleanField(default=True)
+    members = serializers.ListField(child=serializers.DictField(), required=False)
+    file = serializers.FileField(required=False)
+
+    def validate(self, attrs):
+        if not attrs.get('members') and not attrs.get('file'):
+            raise serializers.ValidationError('Provide a list of members or a CSV file')
+        return attrs
+
+
+class BulkSubscriptionActionSerializer(serializers.Serializer):
+    """Ids of the subscriptions to activate or cancel in one request"""
+
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=1000)
@@ -0,0 +1,270 @@
+import os
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from account.models import User, UserRequest
+from subscription.models import MembershipSubscription, SubscriptionPayment, SubscriptionPlan
+from transaction.models import RevenueRollup
+
+
+class SubscriptionQueryCountTests(TestCase):
+    """Serving N subscriptions must take the same number of queries as serving one"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email='admin@example.com', is_admin=True, is_staff=True)
+        cls.member = User.objects.create(email='member@example.com')
+        cls.member.user_request = UserRequest.objects.create(first_name='Ada', last_name='Obi', phone_number='0800')
+        cls.member.save()
+        cls.plans = [
+            SubscriptionPlan.objects.create(name=f'Plan {i}', price=1000 + i) for i in range(3)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def add_subscriptions(self, count):
+        for i in range(count):
+            subscription = MembershipSubscription.objects.create(
+                user=self.member,
+                plan=self.plans[i % len(self.plans)],
+                start_date=date.today(),
+                end_date=date.today() + timedelta(days=30),
+                amount_paid=1000,
+                payment_method='cash',
+            )
+            SubscriptionPayment.objects.create(
+                subscription=subscription,
+                amount=1000,
+                payment_method='cash',
+                payment_reference=f'ref-{subscription.id}',
+            )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def assertConstantQueries(self, url, user):
+        self.client.force_authenticate(user)
+        self.add_subscriptions(1)
+        baseline, _ = self.count_queries(url)
+        self.add_subscriptions(9)
+        queries, response = self.count_queries(url)
+        self.assertEqual(len(response.data['data']['results']), 10)
+        self.assertEqual(queries, baseline)
+
+    def test_my_history_query_count_is_constant(self):
+        self.assertConstantQueries(reverse('my-subscription-history'), self.member)
+
+    def test_user_history_query_count_is_constant(self):
+        self.assertConstantQueries(
+            reverse('user-subscription-history', kwargs={'user_id': self.member.id}), self.admin
+        )
+
+    def test_my_history_detail_shape_query_count_is_constant(self):
+        self.assertConstantQueries(reverse('my-subscription-history') + '?shape=detail', self.member)
+
+    def test_detail_query_count(self):
+        self.add_subscriptions(1)
+        subscription = MembershipSubscription.objects.get()
+        self.client.force_authenticate(self.admin)
+        # Subscription with plan and user, then payments
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('subscription-detail', kwargs={'pk': subscription.id}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user_name'], 'Ada Obi')
+        self.assertEqual(len(response.data['payments']), 1)
+
+
+class SubscriptionHistoryPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = User.objects.create(email='member@example.com')
+        plan = SubscriptionPlan.objects.create(name='Annual', price=1000)
+        cls.subscriptions = [
+            MembershipSubscription.objects.create(
+                user=cls.member,
+                plan=plan,
+                start_date=date.today(),
+                end_date=date.today() + timedelta(days=30),
+                amount_paid=1000,
+                payment_method='cash',
+            )
+            for _ in range(7)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    def test_history_is_paged_with_a_cursor(self):
+        url = reverse('my-subscription-history') + '?page_size=3'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.data['status'])
+            page = response.data['data']
+            self.assertLessEqual(len(page['results']), 3)
+            seen.extend(row['id'] for row in page['results'])
+            url = page['metadata']['next']
+        expected = MembershipSubscription.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        self.assertEqual(seen, [str(pk) for pk in expected])
+
+    def test_list_and_detail_shapes(self):
+        url = reverse('my-subscription-history')
+        row = self.client.get(url).data['data']['results'][0]
+        self.assertIn('plan_name', row)
+        self.assertNotIn('payments', row)
+
+        row = self.client.get(url + '?shape=detail').data['data']['results'][0]
+        self.assertIn('payments', row)
+        self.assertEqual(row['user_email'], self.member.email)
+
+
+class BulkSubscriptionActionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email='admin@example.com', is_admin=True, is_staff=True)
+        plan = SubscriptionPlan.objects.create(name='Annual', price=1000)
+        cls.members = [User.objects.create(email=f'member{i}@example.com') for i in range(5)]
+        cls.subscriptions = [
+            MembershipSubscription.objects.create(
+                user=member,
+                plan=plan,
+                start_date=date.today() - timedelta(days=10),
+                end_date=date.today() + timedelta(days=30),
+                amount_paid=1000,
+                payment_method='cash',
+            )
+            for member in cls.members
+        ]
+        MembershipSubscription.objects.filter(pk=cls.subscriptions[0].pk).update(end_date=date.today() - timedelta(days=1))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_bulk_activate(self):
+        ids = [str(subscription.id) for subscription in self.subscriptions]
+        missing = '00000000-0000-0000-0000-000000000000'
+        # Locked lookup, the UPDATE itself and the current subscription pointers, plus the savepoint pair
+        with self.assertNumQueries(5):
+            response = MembershipSubscription.bulk_activate(ids)
+        self.assertEqual(list(response.values()).count('active'), 4)
+
+        response = self.client.post(reverse('bulk-activate-subscriptions'), {'ids': ids + [missing]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        statuses = {result['id']: result['status'] for result in response.data['data']['results']}
+        self.assertEqual(statuses[ids[0]], 'expired')
+        self.assertEqual(statuses[ids[1]], 'active')
+        self.assertEqual(statuses[missing], 'not_found')
+        self.assertEqual(
+            set(User.objects.filter(pk__in=[m.pk for m in self.members[1:]]).values_list('current_subscription', flat=True)),
+            {subscription.id for subscription in self.subscriptions[1:]},
+        )
+
+    def test_bulk_cancel(self):
+        ids = [str(subscription.id) for subscription in self.subscriptions]
+        MembershipSubscription.bulk_activate(ids)
+        response = self.client.post(reverse('bulk-cancel-subscriptions'), {'ids': ids[1:3]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['updated'], 2)
+        self.assertEqual(MembershipSubscription.objects.filter(status='cancelled', cancelled_at__isnull=False).count(), 2)
+        self.assertFalse(User.objects.filter(pk__in=[m.pk for m in self.members[1:3]], current_subscription__isnull=False).exists())
+
+
+class BulkSubscriptionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email='admin@example.com', is_admin=True, is_staff=True)
+        cls.members = [User.objects.create(email=f'member{i}@example.com') for i in range(4)]
+        cls.plan = SubscriptionPlan.objects.create(name='Yearly', price=5000)
+        cls.start_date = date(2026, 6, 1)
+        cls.end_date = MembershipSubscription.calculate_may_31st_expiration(cls.start_date)
+        MembershipSubscription.objects.create(
+            user=cls.members[3], plan=cls.plan, start_date=cls.start_date, end_date=cls.end_date,
+            amount_paid=5000, payment_method='cash', status='active',
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def post(self, members, **data):
+        data = {'plan': str(self.plan.id), 'start_date': self.start_date.isoformat(), 'members': members, **data}
+        return self.client.post(reverse('bulk-subscription'), data, format='json')
+
+    def test_every_row_gets_a_result(self):
+        response = self.post([
+            {'email': 'member0@EXAMPLE.com'},
+            {'user': str(self.members[1].id), 'amount_paid': '2500', 'payment_reference': 'REF-1'},
+            {'email': 'nobody@example.com'},
+            {'email': 'member0@example.com'},
+            {'email': 'member3@example.com'},
+            {'email': 'member2@example.com', 'start_date': 20240101},
+            {'email': 'member2@example.com', 'amount_paid': 'NaN'},
+            {'email': 'member2@example.com', 'amount_paid': '-1'},
+            {'user': 'not-a-uuid'},
+            {},
+        ])
+        self.assertEqual(response.status_code, 200)
+        data = response.data['data']
+        self.assertEqual((data['created'], data['failed']), (2, 8))
+        results = {result['row']: result for result in data['results']}
+        self.assertEqual([results[row]['status'] for row in (1, 2)], ['created', 'created'])
+        self.assertEqual(results[3]['errors'], 'User not found: nobody@example.com')
+        self.assertEqual(results[4]['errors'], 'Duplicate member in file: member0@example.com')
+        self.assertEqual(results[5]['errors'], f'Already subscribed until {self.end_date.isoformat()}')
+        for row in (6, 7, 8, 9, 10):
+            self.assertEqual(results[row]['status'], 'failed')
+        self.assertTrue(results[6]['errors'].startswith('start_date:'))
+        self.assertTrue(results[7]['errors'].startswith('amount_paid:'))
+        self.assertEqual(results[10]['errors'], 'A user id or email address is required')
+
+        payment = SubscriptionPayment.objects.get(payment_reference='REF-1')
+        self.assertEqual((payment.amount, payment.status), (2500, 'completed'))
+        self.members[1].refresh_from_db()
+        self.assertEqual(self.members[1].current_subscription_id, payment.subscription_id)
+
+        rollup = RevenueRollup.objects.get()
+        self.assertEqual((rollup.category, rollup.plan, rollup.total, rollup.count), ('SUBSCRIPTION', str(self.plan.id), 7500, 2))
+
+    def test_pending_renewal_is_not_revenue(self):
+        response = self.post([{'email': 'member0@example.com'}], activate=False)
+        self.assertEqual(response.data['data']['created'], 1)
+        self.assertEqual(MembershipSubscription.objects.get(user=self.members[0]).status, 'pending')
+        self.assertFalse(RevenueRollup.objects.exists())
+
+    def test_renew_subscriptions_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as file:
+            file.write('email,amount_paid,start_date\n')
+            file.write('member0@example.com,,\n')
+            file.write('member1@example.com,1000,2026-07-01\n')
+            file.write('member2@example.com,NaN,\n')
+            file.write('member3@example.com,,\n')
+        self.addCleanup(os.remove, file.name)
+
+        stdout = StringIO()
+        call_command('renew_subscriptions', file.name, '--plan', 'Yearly', '--start-date', '2026-06-01', stdout=stdout)
+
+        self.assertIn('Created: 2', stdout.getvalue())
+        self.assertIn('Row 4: member2@example.com - amount_paid:', stdout.getvalue())
+        self.assertIn('Row 5: member3@example.com - Already subscribed', stdout.getvalue())
+        self.assertEqual(
+            MembershipSubscription.objects.get(user=self.members[1]).start_date, date(2026, 7, 1)
+        )
+        self.assertEqual(sum(RevenueRollup.objects.values_list('total', flat=True)), 6000)
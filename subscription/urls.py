@@ -4,6 +4,9 @@ from .views import (
     UserSubscriptionHistoryView,
     MySubscriptionHistoryView,
     CreateSubscriptionView,
+    BulkSubscriptionView,
+    BulkActivateSubscriptionView,
+    BulkCancelSubscriptionView,
     SubscriptionDetailView,
     ActivateSubscriptionView,
     CancelSubscriptionView,
@@ -20,9 +23,12 @@ urlpatterns = [
     
     # Subscription management
     path('create/', CreateSubscriptionView.as_view(), name='create-subscription'),
-    path('<int:pk>/', SubscriptionDetailView.as_view(), name='subscription-detail'),
-    path('<int:pk>/activate/', ActivateSubscriptionView.as_view(), name='activate-subscription'),
-    path('<int:pk>/cancel/', CancelSubscriptionView.as_view(), name='cancel-subscription'),
+    path('bulk/', BulkSubscriptionView.as_view(), name='bulk-subscription'),
+    path('bulk/activate/', BulkActivateSubscriptionView.as_view(), name='bulk-activate-subscriptions'),
+    path('bulk/cancel/', BulkCancelSubscriptionView.as_view(), name='bulk-cancel-subscriptions'),
+    path('<uuid:pk>/', SubscriptionDetailView.as_view(), name='subscription-detail'),
+    path('<uuid:pk>/activate/', ActivateSubscriptionView.as_view(), name='activate-subscription'),
+    path('<uuid:pk>/cancel/', CancelSubscriptionView.as_view(), name='cancel-subscription'),
     
     # Active subscription
     path('active/', UserActiveSubscriptionView.as_view(), name='my-active-subscription'),
@@ -1,6 +1,7 @@
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from django.shortcuts import get_object_or_404
 from account.models import User
 from .models import SubscriptionPlan, MembershipSubscription, SubscriptionPayment
@@ -8,9 +9,12 @@ from .serializers import (
     SubscriptionPlanSerializer, 
     MembershipSubscriptionSerializer,
     MembershipSubscriptionListSerializer,
-    CreateSubscriptionSerializer
+    CreateSubscriptionSerializer,
+    BulkSubscriptionSerializer,
+    BulkSubscriptionActionSerializer
 )
-from api.utils.response.response_format import success_response, paginate_success_response, bad_request_response
+from api.utils.subscription_renewal import SubscriptionRenewal
+from api.utils.response.response_format import success_response, paginate_success_response, cursor_paginate_success_response, bad_request_response
 
 
 class SubscriptionPlanListView(generics.ListAPIView):
@@ -20,34 +24,49 @@ class SubscriptionPlanListView(generics.ListAPIView):
     queryset = SubscriptionPlan.objects.filter(is_active=True)
 
 
-class UserSubscriptionHistoryView(generics.ListAPIView):
-    """Get subscription history for a specific user (for admin)"""
+class SubscriptionHistoryListView(generics.ListAPIView):
+    """
+    Base view for subscription history, paginated with a ``(created_at, id)`` cursor.
+
+    The compact list shape is returned by default, ``?shape=detail`` returns
+    the full subscription with its payments.
+    """
     serializer_class = MembershipSubscriptionListSerializer
+    default_page_size = 20
+
+    def get_serializer_class(self):
+        if self.request.GET.get('shape') == 'detail':
+            return MembershipSubscriptionSerializer
+        return self.serializer_class
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        queryset = serializer_class.setup_eager_loading(self.get_queryset())
+        page = cursor_paginate_success_response(
+            request,
+            queryset,
+            int(request.GET.get('page_size', self.default_page_size)),
+            serialize_page=lambda records: serializer_class(records, many=True, context=self.get_serializer_context()).data,
+        )
+        return success_response(data=page.data)
+
+
+class UserSubscriptionHistoryView(SubscriptionHistoryListView):
+    """Get subscription history for a specific user (for admin)"""
     permission_classes = [IsAdminUser]
 
     def get_queryset(self):
         user_id = self.kwargs.get('user_id')
         user = get_object_or_404(User, id=user_id)
-        return MembershipSubscription.objects.filter(user=user).order_by('-created_at')
-
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return success_response(data=serializer.data)
+        return MembershipSubscription.objects.filter(user=user)
 
 
-class MySubscriptionHistoryView(generics.ListAPIView):
+class MySubscriptionHistoryView(SubscriptionHistoryListView):
     """Get subscription history for the authenticated user"""
-    serializer_class = MembershipSubscriptionListSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return MembershipSubscription.objects.filter(user=self.request.user).order_by('-created_at')
-
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return success_response(data=serializer.data)
+        return MembershipSubscription.objects.filter(user=self.request.user)
 
 
 class CreateSubscriptionView(generics.CreateAPIView):
@@ -68,11 +87,52 @@ class CreateSubscriptionView(generics.CreateAPIView):
         )
 
 
+class BulkSubscriptionView(generics.GenericAPIView):
+    """
+    Create subscriptions for many members in one request (admin only).
+
+    Members are sent as a ``members`` list of ``{"user"|"email", "start_date",
+    "amount_paid", "payment_reference"}`` objects or as a CSV ``file`` with
+    the same columns. Large renewals can use the renew_subscriptions command.
+    """
+    serializer_class = BulkSubscriptionSerializer
+    permission_classes = [IsAdminUser]
+    parser_classes = (JSONParser, MultiPartParser, FormParser)
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        renewal = SubscriptionRenewal(
+            data['plan'],
+            start_date=data.get('start_date'),
+            payment_method=data['payment_method'],
+            activate=data['activate'],
+        )
+        if data.get('file'):
+            rows = renewal.read_csv(data['file'])
+        else:
+            rows = enumerate(data['members'], start=1)
+        renewal.run(rows)
+
+        return success_response(
+            data={
+                'created': renewal.created,
+                'failed': renewal.failed,
+                'results': renewal.results,
+            },
+            message=f'Created {renewal.created} subscriptions' + (
+                f' with {renewal.failed} errors' if renewal.failed else ''
+            )
+        )
+
+
 class SubscriptionDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a subscription (admin only)"""
     serializer_class = MembershipSubscriptionSerializer
     permission_classes = [IsAdminUser]
-    queryset = MembershipSubscription.objects.all()
+    queryset = MembershipSubscriptionSerializer.setup_eager_loading(MembershipSubscription.objects.all())
 
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
@@ -97,7 +157,9 @@ class ActivateSubscriptionView(generics.GenericAPIView):
     permission_classes = [IsAdminUser]
 
     def post(self, request, pk):
-        subscription = get_object_or_404(MembershipSubscription, pk=pk)
+        subscription = get_object_or_404(
+            MembershipSubscriptionSerializer.setup_eager_loading(MembershipSubscription.objects.all()), pk=pk
+        )
         subscription.activate()
         
         serializer = MembershipSubscriptionSerializer(subscription)
@@ -112,7 +174,9 @@ class CancelSubscriptionView(generics.GenericAPIView):
     permission_classes = [IsAdminUser]
 
     def post(self, request, pk):
-        subscription = get_object_or_404(MembershipSubscription, pk=pk)
+        subscription = get_object_or_404(
+            MembershipSubscriptionSerializer.setup_eager_loading(MembershipSubscription.objects.all()), pk=pk
+        )
         subscription.cancel()
         
         serializer = MembershipSubscriptionSerializer(subscription)
@@ -122,6 +186,51 @@ class CancelSubscriptionView(generics.GenericAPIView):
         )
 
 
+class BulkSubscriptionActionView(generics.GenericAPIView):
+    """
+    Base view for activating or cancelling many subscriptions at once (admin only).
+
+    The change is applied with a single UPDATE and the response only lists
+    the new status of each id, ids that don't exist are reported as not found.
+    """
+    serializer_class = BulkSubscriptionActionSerializer
+    permission_classes = [IsAdminUser]
+    bulk_action = None
+    message = None
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+
+        statuses = getattr(MembershipSubscription, f'bulk_{self.bulk_action}')(ids)
+
+        results = [
+            {'id': str(pk), 'status': statuses.get(pk, 'not_found')}
+            for pk in ids
+        ]
+        return success_response(
+            data={
+                'updated': len(statuses),
+                'not_found': len(ids) - len(statuses),
+                'results': results,
+            },
+            message=self.message.format(len(statuses))
+        )
+
+
+class BulkActivateSubscriptionView(BulkSubscriptionActionView):
+    """Activate many subscriptions, e.g. a batch of cash payments (admin only)"""
+    bulk_action = 'activate'
+    message = '{} subscriptions activated successfully'
+
+
+class BulkCancelSubscriptionView(BulkSubscriptionActionView):
+    """Cancel many subscriptions (admin only)"""
+    bulk_action = 'cancel'
+    message = '{} subscriptions cancelled successfully'
+
+
 class UserActiveSubscriptionView(generics.GenericAPIView):
     """Get user's current active subscription"""
     permission_classes = [IsAuthenticated]
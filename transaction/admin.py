@@ -1,8 +1,53 @@
 from django.contrib import admin
 
-from transaction.models import Transaction
+import json
+
+from transaction.models import GatewayEvent, RevenueRollup, Transaction, WebhookEvent
 
 # Register your models here.
 
 
-admin.site.register(Transaction)
\ No newline at end of file
+admin.site.register(Transaction)
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('provider', 'event_type', 'event_key', 'status', 'attempts', 'created_at', 'processed_at')
+    list_filter = ('provider', 'status', 'event_type')
+    search_fields = ('event_key',)
+    readonly_fields = ('created_at', 'claimed_at', 'next_attempt_at', 'processed_at')
+    ordering = ('-created_at',)
+
+
+@admin.register(GatewayEvent)
+class GatewayEventAdmin(admin.ModelAdmin):
+    list_display = ('provider', 'source', 'reference', 'encoding', 'created_at')
+    list_filter = ('provider', 'source')
+    search_fields = ('reference',)
+    fields = ('provider', 'source', 'reference', 'encoding', 'created_at', 'pretty_payload')
+    readonly_fields = fields
+    ordering = ('-created_at',)
+
+    @admin.display(description='Payload')
+    def pretty_payload(self, obj):
+        return json.dumps(obj.payload, indent=2)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(RevenueRollup)
+class RevenueRollupAdmin(admin.ModelAdmin):
+    list_display = ('date', 'category', 'plan', 'payment_method', 'total', 'count', 'updated_at')
+    list_filter = ('category', 'payment_method')
+    date_hierarchy = 'date'
+    ordering = ('-date',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,84 @@
+from datetime import date
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction as db_transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils.dateparse import parse_datetime
+
+from subscription.models import SubscriptionPayment
+from transaction.models import RevenueRollup, Transaction, WebhookEvent
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the revenue rollups from paid transactions, subscription payments and '
+        'donation webhooks. Use it to backfill, or after fixing payments by hand.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', type=date.fromisoformat, help='First day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--end-date', type=date.fromisoformat, help='Last day to rebuild (YYYY-MM-DD)')
+
+    def in_range(self, day):
+        return (not self.start_date or day >= self.start_date) and (not self.end_date or day <= self.end_date)
+
+    def filter_days(self, queryset):
+        if self.start_date:
+            queryset = queryset.filter(day__gte=self.start_date)
+        if self.end_date:
+            queryset = queryset.filter(day__lte=self.end_date)
+        return queryset
+
+    def handle(self, *args, **options):
+        self.start_date = options['start_date']
+        self.end_date = options['end_date']
+        if self.start_date and self.end_date and self.start_date > self.end_date:
+            raise CommandError('--start-date must be on or before --end-date')
+
+        totals = {}
+
+        def add(key, total, count):
+            current_total, current_count = totals.get(key, (Decimal('0'), 0))
+            totals[key] = (current_total + total, current_count + count)
+
+        # Same day rules as the incremental updates, see RevenueRollup.get_day
+        transactions = self.filter_days(
+            Transaction.objects.filter(status='success').annotate(day=TruncDate(Coalesce('paid_at', 'created_at')))
+        ).values('day', 'transaction_type').annotate(total=Sum('amount'), count=Count('id')).order_by()
+        for row in transactions:
+            add((row['day'], row['transaction_type'], '', 'paystack'), row['total'], row['count'])
+
+        payments = self.filter_days(
+            SubscriptionPayment.objects.filter(status='completed', paid_at__isnull=False).annotate(day=TruncDate('paid_at'))
+        ).values('day', 'subscription__plan_id', 'payment_method').annotate(total=Sum('amount'), count=Count('id')).order_by()
+        for row in payments:
+            key = (row['day'], RevenueRollup.SUBSCRIPTION, str(row['subscription__plan_id']), row['payment_method'])
+            add(key, row['total'], row['count'])
+
+        donations = WebhookEvent.objects.filter(
+            provider='paystack',
+            event_type='charge.success',
+            status='processed',
+            payload__data__metadata__payment_mode='donation',
+        ).values_list('payload', 'created_at')
+        for payload, created_at in donations.iterator():
+            data = payload.get('data') or {}
+            paid_at = data.get('paid_at') or data.get('paidAt')
+            day = RevenueRollup.get_day((parse_datetime(paid_at) if isinstance(paid_at, str) else None) or created_at)
+            if self.in_range(day):
+                add((day, RevenueRollup.DONATION, '', 'paystack'), Decimal(int(data.get('amount') or 0)) / 100, 1)
+
+        with db_transaction.atomic():
+            existing = RevenueRollup.objects.all()
+            if self.start_date:
+                existing = existing.filter(date__gte=self.start_date)
+            if self.end_date:
+                existing = existing.filter(date__lte=self.end_date)
+            deleted, _ = existing.delete()
+            RevenueRollup.objects.bulk_create([
+                RevenueRollup(date=day, category=category, plan=plan, payment_method=payment_method, total=total, count=count)
+                for (day, category, plan, payment_method), (total, count) in totals.items()
+            ], batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(f'Replaced {deleted} rollup rows with {len(totals)}'))
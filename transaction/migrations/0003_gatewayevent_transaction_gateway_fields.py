@@ -0,0 +1,126 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:50
+
+import json
+import uuid
+import zlib
+from decimal import Decimal, InvalidOperation
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.dateparse import parse_datetime
+
+
+def encode_payload(payload):
+    return zlib.compress(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+
+
+def decode_payload(encoding, data):
+    data = bytes(data)
+    if encoding == 'zlib':
+        data = zlib.decompress(data)
+    return json.loads(data)
+
+
+def extract_fields(payload):
+    fees = payload.get('fees')
+    try:
+        fees = Decimal(str(fees)) / 100 if fees not in (None, '') else None
+    except InvalidOperation:
+        fees = None
+    paid_at = payload.get('paid_at') or payload.get('paidAt')
+    return {
+        'gateway_reference': str(payload.get('id') or '')[:100],
+        'channel': str(payload.get('channel') or '')[:30],
+        'paid_at': parse_datetime(paid_at) if isinstance(paid_at, str) else None,
+        'fees': fees,
+    }
+
+
+def move_payloads(apps, model, field):
+    """Copy each stored payload into a compressed GatewayEvent and keep only the extracted fields"""
+    GatewayEvent = apps.get_model('transaction', 'GatewayEvent')
+    Model = apps.get_model(*model)
+    rows = Model.objects.exclude(**{f'{field}__isnull': True}).values_list('pk', field, 'paid_at')
+    for pk, payload, paid_at in rows.iterator():
+        if not isinstance(payload, dict):
+            continue
+        event = GatewayEvent.objects.create(
+            provider='paystack',
+            source='migrated',
+            reference=str(payload.get('reference') or '')[:100],
+            encoding='zlib',
+            data=encode_payload(payload),
+        )
+        fields = extract_fields(payload)
+        fields['paid_at'] = paid_at or fields['paid_at']
+        Model.objects.filter(pk=pk).update(gateway_event=event, **fields)
+
+
+def restore_payloads(apps, model, field):
+    """Put each row's GatewayEvent payload back in the restored JSON column"""
+    Model = apps.get_model(*model)
+    rows = Model.objects.filter(gateway_event__isnull=False).values_list(
+        'pk', 'gateway_event__encoding', 'gateway_event__data'
+    )
+    for pk, encoding, data in rows.iterator():
+        Model.objects.filter(pk=pk).update(**{field: decode_payload(encoding, data)})
+
+
+def forwards(apps, schema_editor):
+    move_payloads(apps, ('transaction', 'Transaction'), 'response')
+
+
+def backwards(apps, schema_editor):
+    restore_payloads(apps, ('transaction', 'Transaction'), 'response')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transaction', '0002_webhookevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GatewayEvent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('provider', models.CharField(default='paystack', max_length=20)),
+                ('source', models.CharField(max_length=20)),
+                ('reference', models.CharField(db_index=True, max_length=100)),
+                ('encoding', models.CharField(choices=[('json', 'json'), ('zlib', 'zlib')], default='zlib', max_length=10)),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='channel',
+            field=models.CharField(blank=True, max_length=30),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='fees',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='gateway_reference',
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='paid_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='gateway_event',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='transaction.gatewayevent'),
+        ),
+        migrations.RunPython(forwards, backwards),
+        migrations.RemoveField(
+            model_name='transaction',
+            name='response',
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transaction', '0004_transaction_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('category', models.CharField(max_length=20)),
+                ('plan', models.CharField(blank=True, default='', max_length=36)),
+                ('payment_method', models.CharField(blank=True, default='', max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'category', 'plan', 'payment_method'), name='revenuerollup_key')],
+            },
+        ),
+    ]
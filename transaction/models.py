@@ -1,12 +1,114 @@
+import json
 import uuid
-from django.db import models
+import zlib
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, models, transaction as db_transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 from account.models import User
 
 # Create your models here.
 
 
-class Transaction(models.Model):
+class GatewayEvent(models.Model):
+    """
+    Append-only copy of a payload received from a payment gateway.
+
+    Payments only keep the fields we filter on and point at the event they
+    were last updated from, so the full payload stays off the hot rows. The
+    payload is stored as zlib compressed JSON unless
+    ``PAYMENT_GATEWAY_COMPRESS_EVENTS`` is turned off.
+    """
+    AVAILABLE_ENCODINGS = (
+        ('json', 'json'),
+        ('zlib', 'zlib'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    provider = models.CharField(max_length=20, default='paystack')
+    source = models.CharField(max_length=20)
+    reference = models.CharField(max_length=100, db_index=True)
+    encoding = models.CharField(max_length=10, choices=AVAILABLE_ENCODINGS, default='zlib')
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.provider} {self.source} {self.reference}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Gateway events are append-only')
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def encode_payload(payload, compress=True):
+        data = json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':')).encode('utf-8')
+        if compress:
+            return 'zlib', zlib.compress(data)
+        return 'json', data
+
+    @property
+    def payload(self):
+        data = bytes(self.data)
+        if self.encoding == 'zlib':
+            data = zlib.decompress(data)
+        return json.loads(data)
+
+    @classmethod
+    def record(cls, provider, source, payload):
+        compress = getattr(settings, 'PAYMENT_GATEWAY_COMPRESS_EVENTS', True)
+        encoding, data = cls.encode_payload(payload, compress)
+        return cls.objects.create(
+            provider=provider,
+            source=source,
+            reference=str(payload.get('reference') or '')[:100],
+            encoding=encoding,
+            data=data,
+        )
+
+    @staticmethod
+    def extract_fields(payload):
+        """The payload fields kept on the payment row, amounts are sent in kobo"""
+        fees = payload.get('fees')
+        try:
+            fees = Decimal(str(fees)) / 100 if fees not in (None, '') else None
+        except InvalidOperation:
+            fees = None
+        paid_at = payload.get('paid_at') or payload.get('paidAt')
+        return {
+            'gateway_reference': str(payload.get('id') or '')[:100],
+            'channel': str(payload.get('channel') or '')[:30],
+            'paid_at': parse_datetime(paid_at) if isinstance(paid_at, str) else None,
+            'fees': fees,
+        }
+
+
+class GatewayPayment(models.Model):
+    """Extracted gateway fields shared by Transaction and SubscriptionPayment"""
+    gateway_reference = models.CharField(max_length=100, blank=True, db_index=True)
+    channel = models.CharField(max_length=30, blank=True)
+    fees = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    paid_at = models.DateTimeField(null=True, blank=True)
+    gateway_event = models.ForeignKey(
+        GatewayEvent, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+
+    class Meta:
+        abstract = True
+
+    def set_gateway_payload(self, payload, source, provider='paystack'):
+        """Store ``payload`` as a GatewayEvent and copy its filterable fields, the caller saves"""
+        self.gateway_event = GatewayEvent.record(provider, source, payload)
+        for field, value in GatewayEvent.extract_fields(payload).items():
+            if value or not getattr(self, field):
+                setattr(self, field, value)
+
+
+class Transaction(GatewayPayment):
     AVAILABLE_STATUS = (
         ('pending', 'pending'),
         ('success', 'success'),
@@ -16,7 +118,122 @@ class Transaction(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     transaction_type = models.CharField(max_length=10)
-    response= models.JSONField(null=True,blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    status = models.CharField(max_length=10,choices=AVAILABLE_STATUS, default="pending")
\ No newline at end of file
+    status = models.CharField(max_length=10,choices=AVAILABLE_STATUS, default="pending")
+
+    class Meta:
+        indexes = [
+            # Keyset order of the admin listing
+            models.Index(fields=['created_at', 'id'], name='transaction_created_idx'),
+            # Status filter, and revenue sums read from the index alone
+            models.Index(fields=['status', 'created_at', 'transaction_type', 'amount'], name='transaction_revenue_idx'),
+            models.Index(fields=['transaction_type', 'created_at'], name='transaction_type_created_idx'),
+            models.Index(fields=['user', 'created_at'], name='transaction_user_created_idx'),
+        ]
+
+
+class WebhookEvent(models.Model):
+    """
+    Raw payment gateway webhook, stored as received.
+
+    The webhook endpoint only inserts the event, ``event_key`` is unique so
+    repeated deliveries of the same event are dropped by the database. The
+    process_webhooks command applies pending events afterwards, an event
+    that failed is not picked up again before ``next_attempt_at``.
+    """
+    AVAILABLE_STATUS = (
+        ('pending', 'pending'),
+        ('processing', 'processing'),
+        ('processed', 'processed'),
+        ('failed', 'failed'),
+    )
+    MAX_ATTEMPTS = 5
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    provider = models.CharField(max_length=20, default='paystack')
+    event_key = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=AVAILABLE_STATUS, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    result = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='webhookevent_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.event_type} ({self.status})"
+
+
+class RevenueRollup(models.Model):
+    """
+    Paid amounts summed per day, category, plan and payment method.
+
+    Rows are incremented when a payment completes, so revenue reports read
+    one row per day and dimension instead of every payment. ``category`` is
+    the transaction type, ``SUBSCRIPTION`` or ``DONATION``, and ``plan``
+    holds the plan id of subscription payments. The
+    rebuild_revenue_rollups command recomputes them from the payments.
+    """
+    SUBSCRIPTION = 'SUBSCRIPTION'
+    DONATION = 'DONATION'
+
+    date = models.DateField()
+    category = models.CharField(max_length=20)
+    plan = models.CharField(max_length=36, blank=True, default='')
+    payment_method = models.CharField(max_length=20, blank=True, default='')
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'category', 'plan', 'payment_method'], name='revenuerollup_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.category} {self.total} ({self.count})"
+
+    @staticmethod
+    def get_day(paid_at):
+        return timezone.localdate(paid_at or timezone.now())
+
+    @classmethod
+    def add(cls, day, category, amount, plan='', payment_method='', count=1):
+        """Add ``amount`` to the day's row with an F() update, inserting it on first use"""
+        key = {'date': day, 'category': category, 'plan': str(plan or ''), 'payment_method': payment_method}
+        increment = {'total': F('total') + amount, 'count': F('count') + count, 'updated_at': timezone.now()}
+        if cls.objects.filter(**key).update(**increment):
+            return
+        try:
+            with db_transaction.atomic():
+                cls.objects.create(total=amount, count=count, **key)
+        except IntegrityError:
+            # Another payment for the same key inserted the row first
+            cls.objects.filter(**key).update(**increment)
+
+    @classmethod
+    def add_many(cls, payments):
+        """Add ``(day, category, plan, payment_method, amount)`` tuples, one update per distinct key"""
+        totals = {}
+        for day, category, plan, payment_method, amount in payments:
+            total, count = totals.get((day, category, plan, payment_method), (0, 0))
+            totals[(day, category, plan, payment_method)] = (total + amount, count + 1)
+        for (day, category, plan, payment_method), (total, count) in totals.items():
+            cls.add(day, category, total, plan, payment_method, count)
+
+    @classmethod
+    def add_transaction(cls, transaction):
+        cls.add(
+            cls.get_day(transaction.paid_at or transaction.created_at),
+            transaction.transaction_type,
+            transaction.amount,
+            payment_method='paystack',
+        )
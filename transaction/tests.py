@@ -1,3 +1,388 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+from datetime import datetime, timedelta, timezone
+from io import StringIO
 
-# Create your tests here.
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone as django_timezone
+from rest_framework.test import APIClient
+
+from account.models import IDCard, User
+from subscription.models import MembershipSubscription, SubscriptionPayment, SubscriptionPlan
+from api.utils.payment.stub import PaystackStubServer
+from api.utils.webhooks import WebhookProcessor
+from transaction.models import GatewayEvent, RevenueRollup, Transaction, WebhookEvent
+
+
+class PaystackStubMixin:
+    """Points the Paystack client at a local stub, ``add_charge`` sets what its verify API returns"""
+
+    def setUp(self):
+        super().setUp()
+        self.stub = PaystackStubServer().start()
+        self.addCleanup(self.stub.stop)
+        stub_settings = override_settings(PAYSTACK_BASE_URL=self.stub.url)
+        stub_settings.enable()
+        self.addCleanup(stub_settings.disable)
+
+    def add_charge(self, reference, amount, charge_id, metadata=None):
+        self.stub.payments[str(reference)] = {'id': charge_id, 'amount': amount, 'email': None, 'metadata': metadata or {}}
+
+
+@override_settings(PAYSTACK_SECRET_KEY='sk_test_webhook_key')
+class PaystackWebhookTests(PaystackStubMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email='member@example.com')
+        cls.transaction = Transaction.objects.create(
+            user=cls.user, amount=500, transaction_type='ID', status='pending'
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def get_payload(self, event='charge.success', amount=50000):
+        return {
+            'event': event,
+            'data': {
+                'id': 1234, 'reference': str(self.transaction.id), 'status': 'success', 'amount': amount,
+                'channel': 'card', 'fees': 750, 'paid_at': '2026-05-01T10:00:00.000Z',
+            },
+        }
+
+    def post(self, payload, signature=None, key=None):
+        body = json.dumps(payload).encode('utf-8')
+        if signature is None:
+            key = key or settings.PAYSTACK_SECRET_KEY
+            signature = hmac.new(key.encode('utf-8'), body, hashlib.sha512).hexdigest()
+        return self.client.generic(
+            'POST', reverse('PaystackWebhookView'), body,
+            content_type='application/json', HTTP_X_PAYSTACK_SIGNATURE=signature,
+        )
+
+    def test_invalid_signature_is_rejected(self):
+        response = self.post(self.get_payload(), signature='invalid')
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_payload_signed_with_another_key_is_rejected(self):
+        response = self.post(self.get_payload(), key='sk_test_f2c4c12c87df60bc178d3be7a19ba4a975d17527')
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_webhooks_are_rejected_without_a_secret_key(self):
+        payload = self.get_payload()
+        signature = hmac.new(b'', json.dumps(payload).encode('utf-8'), hashlib.sha512).hexdigest()
+        with override_settings(PAYSTACK_SECRET_KEY=''):
+            self.assertEqual(self.post(payload, signature=signature).status_code, 401)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_charge_is_confirmed_with_paystack(self):
+        # Correctly signed, but Paystack has no such charge
+        self.post(self.get_payload())
+        call_command('process_webhooks', '--once', stdout=StringIO())
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.status, 'pending')
+        self.assertIn('could not verify', event.result)
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.status, 'pending')
+        self.assertFalse(IDCard.objects.filter(user=self.user, is_active=True).exists())
+
+    def test_event_is_stored_with_one_insert(self):
+        with self.assertNumQueries(1):
+            response = self.post(self.get_payload())
+        self.assertEqual(response.status_code, 200)
+        # Paystack retrying the delivery doesn't add a row
+        self.assertEqual(self.post(self.get_payload()).status_code, 200)
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+        # Nothing is applied until the worker runs
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.status, 'pending')
+
+    def test_processing_is_idempotent(self):
+        self.add_charge(self.transaction.id, 50000, 1234)
+        self.post(self.get_payload())
+        call_command('process_webhooks', '--once', stdout=StringIO())
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.status, 'success')
+        self.assertEqual(self.transaction.gateway_reference, '1234')
+        self.assertEqual(self.transaction.channel, 'card')
+        self.assertEqual(str(self.transaction.fees), '7.50')
+        self.assertEqual(self.transaction.gateway_event.payload['reference'], str(self.transaction.id))
+        card = IDCard.objects.get(user=self.user)
+        self.assertTrue(card.is_active)
+
+        # Same payment delivered as a new event: the locked status check makes it a no-op
+        payload = self.get_payload()
+        payload['data']['id'] = 5678
+        self.post(payload)
+        call_command('process_webhooks', '--once', stdout=StringIO())
+        event = WebhookEvent.objects.get(event_key__endswith=':5678')
+        self.assertEqual(event.status, 'processed')
+        self.assertEqual(event.result, 'Transaction already successful')
+        self.assertEqual(IDCard.objects.get(user=self.user).updated_at, card.updated_at)
+
+    def test_amount_mismatch_is_not_applied(self):
+        self.add_charge(self.transaction.id, 100, 1234)
+        self.post(self.get_payload(amount=100))
+        call_command('process_webhooks', '--once', stdout=StringIO())
+        event = WebhookEvent.objects.get()
+        # Retried later, not straight away
+        self.assertEqual(event.status, 'pending')
+        self.assertEqual(event.attempts, 1)
+        self.assertGreater(event.next_attempt_at, django_timezone.now())
+        self.assertEqual(WebhookProcessor.claim_batch(10), [])
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.status, 'pending')
+
+    def test_failed_event_backs_off_until_attempts_run_out(self):
+        self.add_charge(self.transaction.id, 100, 1234)
+        self.post(self.get_payload(amount=100))
+        delays = []
+        for _ in range(WebhookEvent.MAX_ATTEMPTS):
+            WebhookEvent.objects.update(next_attempt_at=None)
+            event = WebhookProcessor.process(WebhookProcessor.claim_batch(10)[0])
+            if event.status == 'pending':
+                delays.append(event.next_attempt_at - django_timezone.now())
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'failed')
+        self.assertEqual(event.attempts, WebhookEvent.MAX_ATTEMPTS)
+        self.assertEqual(len(delays), WebhookEvent.MAX_ATTEMPTS - 1)
+        self.assertEqual(delays, sorted(delays))
+
+    def test_stale_claims_are_requeued(self):
+        self.add_charge(self.transaction.id, 50000, 1234)
+        self.post(self.get_payload())
+        event, = WebhookProcessor.claim_batch(10)
+        # Still held by a live worker
+        self.assertEqual(WebhookProcessor.claim_batch(10), [])
+
+        WebhookEvent.objects.update(claimed_at=django_timezone.now() - WebhookProcessor.stale_after - timedelta(seconds=1))
+        event, = WebhookProcessor.claim_batch(10)
+        self.assertEqual(event.attempts, 2)
+        self.assertEqual(WebhookProcessor.process(event).status, 'processed')
+
+    def test_stale_claims_fail_after_max_attempts(self):
+        self.post(self.get_payload())
+        WebhookEvent.objects.update(
+            status='processing',
+            attempts=WebhookEvent.MAX_ATTEMPTS,
+            claimed_at=django_timezone.now() - WebhookProcessor.stale_after - timedelta(seconds=1),
+        )
+        self.assertEqual(WebhookProcessor.requeue_stale(), (0, 1))
+        self.assertEqual(WebhookEvent.objects.get().status, 'failed')
+
+
+class GatewayEventTests(TestCase):
+
+    def get_payload(self):
+        return {'id': 99, 'reference': 'ref-1', 'status': 'success', 'log': {'history': ['x' * 50] * 20}}
+
+    def test_payload_is_compressed(self):
+        event = GatewayEvent.record('paystack', 'verify', self.get_payload())
+        event = GatewayEvent.objects.get(pk=event.pk)
+        self.assertEqual(event.encoding, 'zlib')
+        self.assertLess(len(event.data), len(json.dumps(self.get_payload())))
+        self.assertEqual(event.payload, self.get_payload())
+        self.assertEqual(event.reference, 'ref-1')
+
+    @override_settings(PAYMENT_GATEWAY_COMPRESS_EVENTS=False)
+    def test_compression_can_be_turned_off(self):
+        event = GatewayEvent.objects.get(pk=GatewayEvent.record('paystack', 'verify', self.get_payload()).pk)
+        self.assertEqual(event.encoding, 'json')
+        self.assertEqual(event.payload, self.get_payload())
+
+    def test_events_are_append_only(self):
+        event = GatewayEvent.record('paystack', 'verify', self.get_payload())
+        event.source = 'webhook'
+        with self.assertRaises(ValueError):
+            event.save()
+
+
+class GatewayPayloadMigrationTests(TransactionTestCase):
+    migrate_from = ('transaction', '0003_gatewayevent_transaction_gateway_fields')
+    migrate_to = ('transaction', '0002_webhookevent')
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([target])
+        return executor.loader.project_state([target]).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        super().tearDown()
+
+    def test_rollback_restores_the_payloads(self):
+        apps = self.migrate(self.migrate_from)
+        payload = {'id': 1234, 'reference': 'ref-1', 'status': 'success', 'channel': 'card'}
+        encoding, data = GatewayEvent.encode_payload(payload)
+        event = apps.get_model('transaction', 'GatewayEvent').objects.create(
+            source='verify', reference='ref-1', encoding=encoding, data=data
+        )
+        transaction = apps.get_model('transaction', 'Transaction').objects.create(
+            # The account tables aren't rolled back, use the current model
+            user_id=User.objects.create(email='member@example.com').pk,
+            amount=500, transaction_type='ID', status='success', gateway_event=event,
+        )
+
+        Transaction = self.migrate(self.migrate_to).get_model('transaction', 'Transaction')
+        self.assertEqual(Transaction.objects.get(pk=transaction.pk).response, payload)
+
+
+class AdminTransactionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email='admin@example.com', is_admin=True, is_staff=True)
+        cls.member = User.objects.create(email='member@example.com')
+        rows = [
+            ('2026-01-05T10:00', 'ID', 'success', 500),
+            ('2026-01-05T18:00', 'DONATION', 'success', 2000),
+            ('2026-01-20T09:00', 'ID', 'success', 500),
+            ('2026-01-20T09:30', 'ID', 'failed', 500),
+            ('2026-02-02T12:00', 'ID', 'success', 500),
+        ]
+        for created_at, transaction_type, status, amount in rows:
+            transaction = Transaction.objects.create(
+                user=cls.member, amount=amount, transaction_type=transaction_type, status=status
+            )
+            Transaction.objects.filter(pk=transaction.pk).update(
+                created_at=datetime.fromisoformat(created_at).replace(tzinfo=timezone.utc)
+            )
+        call_command('rebuild_revenue_rollups', stdout=StringIO())
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_members_cannot_list_transactions(self):
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get(reverse('AdminTransactionListView')).status_code, 403)
+
+    def test_list_is_filtered_and_cursor_paginated(self):
+        url = reverse('AdminTransactionListView')
+        response = self.client.get(url, {'status': 'success', 'transaction_type': 'ID', 'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        page = response.data['data']
+        self.assertEqual([row['created_at'][:10] for row in page['results']], ['2026-02-02', '2026-01-20'])
+        self.assertEqual(page['results'][0]['user_email'], 'member@example.com')
+
+        response = self.client.get(page['metadata']['next'])
+        self.assertEqual([row['created_at'][:10] for row in response.data['data']['results']], ['2026-01-05'])
+
+        response = self.client.get(url, {'start_date': '2026-01-20', 'end_date': '2026-01-20'})
+        self.assertEqual(len(response.data['data']['results']), 2)
+
+    def test_invalid_filters_are_rejected(self):
+        response = self.client.get(reverse('AdminTransactionListView'), {'start_date': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_daily_revenue(self):
+        response = self.client.get(reverse('AdminTransactionRevenueView'), {
+            'period': 'day', 'start_date': '2026-01-01', 'end_date': '2026-01-31',
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.data['data']
+        self.assertEqual(data['total'], 3000)
+        self.assertEqual(data['count'], 3)
+        self.assertEqual([row['period'] for row in data['results']], ['2026-01-05', '2026-01-20'])
+        self.assertEqual(data['results'][0]['by_type']['DONATION']['total'], 2000)
+
+    def test_monthly_revenue(self):
+        response = self.client.get(reverse('AdminTransactionRevenueView'), {
+            'period': 'month', 'start_date': '2026-01-01', 'end_date': '2026-12-31', 'category': 'ID',
+        })
+        data = response.data['data']
+        self.assertEqual([(row['period'], row['total']) for row in data['results']], [('2026-01', 1000), ('2026-02', 500)])
+
+
+class RevenueRollupTests(PaystackStubMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = User.objects.create(email='member@example.com')
+        cls.plan = SubscriptionPlan.objects.create(name='Yearly', price=5000)
+        cls.subscription = MembershipSubscription.objects.create(
+            user=cls.member,
+            plan=cls.plan,
+            start_date=datetime(2026, 6, 1).date(),
+            end_date=datetime(2027, 5, 31).date(),
+            amount_paid=5000,
+            payment_method='bank_transfer',
+        )
+
+    def get_rollups(self):
+        return sorted(RevenueRollup.objects.values_list('category', 'plan', 'payment_method', 'total', 'count'))
+
+    def add_payment(self, reference, amount=5000):
+        return SubscriptionPayment.objects.create(
+            subscription=self.subscription, amount=amount, payment_method='bank_transfer', payment_reference=reference
+        )
+
+    def test_subscription_payment_is_counted_once(self):
+        payment = self.add_payment('ref-1')
+        payment.mark_as_paid()
+        payment.mark_as_paid()
+        self.add_payment('ref-2', amount=2500).mark_as_paid()
+        self.assertEqual(self.get_rollups(), [('SUBSCRIPTION', str(self.plan.id), 'bank_transfer', 7500, 2)])
+
+    def test_paystack_success_paths_update_the_rollups(self):
+        transaction = Transaction.objects.create(user=self.member, amount=500, transaction_type='ID')
+        self.add_charge(transaction.id, 50000, 1)
+        self.add_charge('donation-1', 150000, 2, metadata={'payment_mode': 'donation'})
+        for payload in (
+            {'event': 'charge.success', 'data': {'id': 1, 'reference': str(transaction.id), 'amount': 50000}},
+            {'event': 'charge.success', 'data': {
+                'id': 2, 'reference': 'donation-1', 'amount': 150000, 'metadata': {'payment_mode': 'donation'},
+            }},
+        ):
+            WebhookEvent.objects.create(
+                event_key=f"paystack:{payload['event']}:{payload['data']['id']}", event_type=payload['event'], payload=payload
+            )
+        call_command('process_webhooks', '--once', stdout=StringIO())
+        self.assertEqual(self.get_rollups(), [('DONATION', '', 'paystack', 1500, 1), ('ID', '', 'paystack', 500, 1)])
+
+    def test_donation_event_is_counted_once(self):
+        self.add_charge('donation-1', 150000, 2, metadata={'payment_mode': 'donation'})
+        WebhookEvent.objects.create(
+            event_key='paystack:charge.success:2', event_type='charge.success',
+            payload={'event': 'charge.success', 'data': {
+                'id': 2, 'reference': 'donation-1', 'amount': 150000, 'metadata': {'payment_mode': 'donation'},
+            }},
+        )
+        slow, = WebhookProcessor.claim_batch(10)
+        WebhookEvent.objects.update(claimed_at=django_timezone.now() - WebhookProcessor.stale_after - timedelta(seconds=1))
+        event, = WebhookProcessor.claim_batch(10)
+        self.assertEqual(WebhookProcessor.process(event).status, 'processed')
+
+        # The worker that was too slow, and a repeated run, are rolled back
+        self.assertEqual(WebhookProcessor.process(slow).result, 'Claimed by another worker')
+        self.assertEqual(WebhookProcessor.process(event).result, 'Claimed by another worker')
+        self.assertEqual(WebhookEvent.objects.get().status, 'processed')
+        self.assertEqual(self.get_rollups(), [('DONATION', '', 'paystack', 1500, 1)])
+
+    def test_rebuild_matches_incremental_updates(self):
+        self.add_payment('ref-1').mark_as_paid()
+        transaction = Transaction.objects.create(user=self.member, amount=500, transaction_type='ID')
+        self.add_charge(transaction.id, 50000, 1)
+        WebhookEvent.objects.create(
+            event_key='paystack:charge.success:1', event_type='charge.success',
+            payload={'event': 'charge.success', 'data': {'id': 1, 'reference': str(transaction.id), 'amount': 50000}},
+        )
+        call_command('process_webhooks', '--once', stdout=StringIO())
+        incremental = self.get_rollups()
+
+        RevenueRollup.objects.all().delete()
+        call_command('rebuild_revenue_rollups', stdout=StringIO())
+        self.assertEqual(self.get_rollups(), incremental)